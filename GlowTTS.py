@@ -9,10 +9,14 @@ from TTS.tts.configs.glow_tts_config import GlowTTSConfig
 from TTS.tts.configs.shared_configs import CharactersConfig
 from TTS.tts.configs.shared_configs import BaseDatasetConfig
 from formatters import custom_bulgarian_formatter
+from batch_sampler import attach_to_model
+from token_cache import attach_token_cache
+from waveform_corpus import load_corpus, attach_to_audio_processor
 
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 
 output_path = "train_dir"
+max_batch_frames = None
 if not os.path.exists(output_path):
     os.makedirs(output_path)
 
@@ -64,6 +68,10 @@ config.characters = CharactersConfig(
 
 ap = AudioProcessor.init_from_config(config)
 
+# Serve the training wavs from one memory-mapped int16 file instead of a wav per sample.
+corpus = load_corpus(os.path.join(dataset_config.path, dataset_config.meta_file_train), ap.sample_rate, ap.resample)
+attach_to_audio_processor(ap, corpus)
+
 tokenizer, config = TTSTokenizer.init_from_config(config)
 
 train_samples, eval_samples = load_tts_samples(
@@ -74,8 +82,15 @@ train_samples, eval_samples = load_tts_samples(
     formatter=custom_bulgarian_formatter,
 )
 
+# Reuse the token ids of earlier runs; a new characters config starts a new cache.
+attach_token_cache(tokenizer, config, train_samples + eval_samples)
+
 model = GlowTTS(config, ap, tokenizer, speaker_manager=None)
 
+# Batch utterances of similar length; set max_batch_frames to cap batches by
+# padded mel frames instead of only by batch_size.
+attach_to_model(model, corpus, max_frames=max_batch_frames)
+
 trainer = Trainer(
     TrainerArgs(gpu=0), config, output_path, model=model, train_samples=train_samples, eval_samples=eval_samples
 )
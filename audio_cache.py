@@ -0,0 +1,168 @@
+import os
+import re
+import csv
+import shutil
+import hashlib
+import argparse
+import unicodedata
+from tts_backends import OUTPUT_FORMAT, VOICE_NAME
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+CACHE_DIR = "audio_cache"
+METADATA_FILE = os.path.join("output_audio", "metadata.csv")
+
+WHITESPACE = re.compile(r"\s+")
+UNSAFE_NAME = re.compile(r"[^\w.-]+")
+
+# --------------------------------------------------------------------
+# 2. Keys
+# --------------------------------------------------------------------
+
+def normalize(text):
+    """
+    Text as it matters to the synthesizer: NFC-normalized, with runs of
+    whitespace collapsed to single spaces and no surrounding whitespace.
+    """
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def cache_key(text, voice=VOICE_NAME, output_format=OUTPUT_FORMAT):
+    return hashlib.sha256("\x1f".join((normalize(text), voice, output_format)).encode("utf-8")).hexdigest()
+
+def namespace(voice=VOICE_NAME, output_format=OUTPUT_FORMAT):
+    """
+    Folder name of a voice and output format inside the cache root: a
+    readable slug of both plus a short hash, as voices may contain slashes.
+    """
+    name = "\x1f".join((voice, output_format))
+    slug = UNSAFE_NAME.sub("_", f"{voice}-{output_format}")
+    return f"{slug}-{hashlib.sha256(name.encode('utf-8')).hexdigest()[:8]}"
+
+def link_or_copy(source, target):
+    """
+    Hard-link source to target, replacing target, or copy it when the two
+    are on different filesystems.
+    """
+    tmp_target = target + ".tmp"
+    if os.path.exists(tmp_target):
+        os.remove(tmp_target)
+    try:
+        os.link(source, tmp_target)
+    except OSError:
+        shutil.copyfile(source, tmp_target)
+    os.replace(tmp_target, target)
+
+# --------------------------------------------------------------------
+# 3. Cache
+# --------------------------------------------------------------------
+
+class AudioCache:
+    """
+    Content-addressed store of synthesized wavs, keyed by the hash of the
+    normalized text, the voice and the output format, so that the same
+    sentence is never paid for twice whatever id or file name it has in the
+    current corpus. Each voice and output format has its own folder,
+    root/<namespace>/<key[:2]>/<key>.wav, which entries() and gc() never
+    leave, so backends and voices can share one root. Entries are shared
+    with output folders through hard links where possible.
+    """
+
+    def __init__(self, root=CACHE_DIR, voice=VOICE_NAME, output_format=OUTPUT_FORMAT):
+        self.root = root
+        self.voice = voice
+        self.output_format = output_format
+        self.directory = os.path.join(root, namespace(voice, output_format))
+        self.hits = 0
+        self.stored = 0
+
+    def path(self, text):
+        key = cache_key(text, self.voice, self.output_format)
+        path = os.path.join(self.directory, key[:2], key + ".wav")
+        # Entries from before the per-voice folders sit in root/<key[:2]>/;
+        # their key already covers the voice and format, so adopt them.
+        legacy = os.path.join(self.root, key[:2], key + ".wav")
+        if not os.path.exists(path) and os.path.exists(legacy):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(legacy, path)
+        return path
+
+    def fetch(self, text, target):
+        """
+        Place the cached audio of text at target. Returns False on a miss.
+        """
+        path = self.path(text)
+        if not os.path.exists(path):
+            return False
+        link_or_copy(path, target)
+        self.hits += 1
+        return True
+
+    def store(self, text, source):
+        """
+        Add the synthesized wav at source to the cache.
+        """
+        path = self.path(text)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            link_or_copy(source, path)
+            self.stored += 1
+
+    def entries(self):
+        """
+        (key, path) of every entry of this cache's voice and output format.
+        """
+        for directory in sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []:
+            for filename in sorted(os.listdir(os.path.join(self.directory, directory))):
+                if filename.endswith(".wav"):
+                    yield filename[:-len(".wav")], os.path.join(self.directory, directory, filename)
+
+    def gc(self, metadata_files, dry_run=False):
+        """
+        Remove entries of this cache's voice and output format whose text
+        appears in none of the given metadata.csv files; other voices and
+        formats are left alone. Returns the number of entries and bytes
+        removed.
+        """
+        referenced = set()
+        for metadata_file in metadata_files:
+            with open(metadata_file, "r", encoding="utf-8", newline="") as infile:
+                for row in csv.DictReader(infile):
+                    referenced.add(cache_key(row["sentence"], self.voice, self.output_format))
+        removed = freed = 0
+        for key, path in self.entries():
+            if key not in referenced:
+                freed += os.path.getsize(path)
+                removed += 1
+                if not dry_run:
+                    os.remove(path)
+        return removed, freed
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or garbage-collect the synthesized audio cache.")
+    parser.add_argument("command", choices=["stats", "gc"], help="stats: size of the cache; gc: drop unused entries.")
+    parser.add_argument("--cache-dir", type=str, default=CACHE_DIR, help="Cache folder.")
+    parser.add_argument("--metadata", type=str, nargs="+", default=[METADATA_FILE],
+                        help="metadata.csv files whose sentences must stay cached.")
+    parser.add_argument("--voice", type=str, default=VOICE_NAME, help="Voice the cache entries were made with.")
+    parser.add_argument("--output-format", type=str, default=OUTPUT_FORMAT,
+                        help="Output format the cache entries were made with.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what gc would remove.")
+    args = parser.parse_args()
+
+    cache = AudioCache(args.cache_dir, voice=args.voice, output_format=args.output_format)
+    if args.command == "stats":
+        sizes = [os.path.getsize(path) for _, path in cache.entries()]
+        print(f"{len(sizes)} cached wav files, {sum(sizes) / 1e6:.1f} MB in {cache.directory}.")
+    else:
+        removed, freed = cache.gc(args.metadata, dry_run=args.dry_run)
+        action = "Would remove" if args.dry_run else "Removed"
+        print(f"{action} {removed} unreferenced entries ({freed / 1e6:.1f} MB).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import io
+import wave
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+# Audio kept before and after each sentence when cutting a batch apart.
+SPLIT_PADDING_SECONDS = 0.1
+# Azure reports audio offsets in ticks of 100 nanoseconds.
+TICKS_PER_SECOND = 10_000_000
+
+# Quality checks: audio is measured in frames of FRAME_SECONDS, and a frame
+# whose RMS is below SILENCE_RMS (about -40 dBFS) counts as silence.
+FRAME_SECONDS = 0.01
+SILENCE_RMS = 0.01
+# Less speech than this is an empty result.
+MIN_SPEECH_SECONDS = 0.1
+# Less speech per character than this means the audio was cut short; normal
+# Bulgarian speech takes about 0.08 seconds per character.
+MIN_SECONDS_PER_CHARACTER = 0.03
+# Per-sentence statistics stored in the journal and metadata.csv.
+AUDIO_STATS = ("duration", "leading_silence", "trailing_silence", "rms", "peak", "seconds_per_character")
+
+# --------------------------------------------------------------------
+# 2. WAV bytes
+# --------------------------------------------------------------------
+
+def read_pcm(wav_bytes):
+    """
+    Decode 16-bit PCM wav bytes into an int16 sample array and its rate.
+    """
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError("Expected 16-bit mono PCM audio.")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2"), wav.getframerate()
+
+def write_wav(samples, rate):
+    """
+    Encode int16 mono samples as wav bytes.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+    return buffer.getvalue()
+
+# --------------------------------------------------------------------
+# 3. Splitting batched audio
+# --------------------------------------------------------------------
+
+def split_at_bookmarks(wav_bytes, marks, count, padding=SPLIT_PADDING_SECONDS):
+    """
+    Cut the audio of a batched request back into one wav per sentence.
+    marks are (name, offset_ticks) pairs from the bookmark events, where
+    sentence i is wrapped in the bookmarks "s{i}" and "e{i}". Each piece
+    keeps `padding` seconds around the sentence, but never reaches past the
+    middle of the pause to its neighbours.
+    """
+    offsets = {name: ticks / TICKS_PER_SECOND for name, ticks in marks}
+    missing = [name for i in range(count) for name in (f"s{i}", f"e{i}") if name not in offsets]
+    if missing:
+        raise ValueError(f"Bookmarks missing from the synthesized audio: {', '.join(missing)}")
+
+    samples, rate = read_pcm(wav_bytes)
+    total = len(samples) / rate
+    pieces = []
+    for i in range(count):
+        start, end = offsets[f"s{i}"], offsets[f"e{i}"]
+        low = (offsets[f"e{i - 1}"] + start) / 2 if i else 0.0
+        high = (end + offsets[f"s{i + 1}"]) / 2 if i + 1 < count else total
+        first = int(max(start - padding, low) * rate)
+        last = int(min(end + padding, high) * rate)
+        pieces.append(write_wav(samples[first:last], rate))
+    return pieces
+
+# --------------------------------------------------------------------
+# 4. Quality checks
+# --------------------------------------------------------------------
+
+def audio_stats(samples, rate, text):
+    """
+    Statistics of one sentence's int16 samples: duration, leading and
+    trailing silence (seconds), RMS and peak (as a fraction of full scale)
+    and seconds of speech per character of text.
+    """
+    x = np.asarray(samples, dtype=np.float32) / 32768
+    frame = max(int(rate * FRAME_SECONDS), 1)
+    frames = len(x) // frame
+    energy = np.sqrt(np.mean(x[:frames * frame].reshape(frames, frame) ** 2, axis=1)) if frames else np.empty(0)
+    voiced = np.flatnonzero(energy >= SILENCE_RMS)
+    duration = len(x) / rate
+    if len(voiced):
+        leading = voiced[0] * frame / rate
+        trailing = max(duration - (voiced[-1] + 1) * frame / rate, 0.0)
+    else:
+        leading, trailing = duration, 0.0
+    speech = duration - leading - trailing
+    return {
+        "duration": duration,
+        "leading_silence": leading,
+        "trailing_silence": trailing,
+        "rms": float(np.sqrt(np.mean(x ** 2))) if len(x) else 0.0,
+        "peak": float(np.max(np.abs(x))) if len(x) else 0.0,
+        "seconds_per_character": speech / max(len(text.strip()), 1),
+    }
+
+def wav_stats(wav_bytes, text):
+    samples, rate = read_pcm(wav_bytes)
+    return audio_stats(samples, rate, text)
+
+def audio_problem(stats):
+    """
+    Why the audio described by stats should be synthesized again ("empty"
+    or "truncated"), or None when it looks fine.
+    """
+    speech = stats["duration"] - stats["leading_silence"] - stats["trailing_silence"]
+    if speech < MIN_SPEECH_SECONDS:
+        return "empty"
+    if stats["seconds_per_character"] < MIN_SECONDS_PER_CHARACTER:
+        return "truncated"
+    return None
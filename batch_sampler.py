@@ -0,0 +1,179 @@
+import os
+import argparse
+import numpy as np
+from metadata_index import METADATA_FILE, load_index
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+SAMPLE_RATE = 22050
+HOP_LENGTH = 256
+# Utterances are sorted by length within pools of this many batches, so that
+# batches hold similar lengths while their contents still change every epoch.
+POOL_BATCHES = 50
+
+def padding_efficiency(batches, lengths):
+    """
+    Share of the padded frames of batches that are real audio frames.
+    """
+    real = sum(int(lengths[batch].sum()) for batch in batches)
+    padded = sum(len(batch) * int(lengths[batch].max()) for batch in batches)
+    return real / padded if padded else 1.0
+
+# --------------------------------------------------------------------
+# 2. Sampling
+# --------------------------------------------------------------------
+
+class DurationBucketSampler:
+    """
+    Batch sampler that groups utterances of similar length. Each epoch the
+    utterances are shuffled, sorted by length within pools of POOL_BATCHES
+    batches and cut into batches, and the batches are shuffled. A batch
+    holds at most batch_size utterances and, when max_frames is given, at
+    most max_frames padded frames (utterances x longest utterance); an
+    utterance longer than max_frames gets a batch of its own.
+    Pass it to torch.utils.data.DataLoader as batch_sampler.
+    """
+
+    def __init__(self, lengths, batch_size=32, max_frames=None, shuffle=True, seed=None, verbose=True):
+        if not batch_size and not max_frames:
+            raise ValueError("Set batch_size, max_frames or both.")
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.batch_size = batch_size
+        self.max_frames = max_frames
+        self.shuffle = shuffle
+        self.seed = seed
+        self.verbose = verbose
+        self.epoch = 0
+        self.batches = None
+
+    def cut(self, order):
+        """
+        Cut order, a sequence of utterance indices, into batches.
+        """
+        batches, batch, longest = [], [], 0
+        for i in order:
+            length = int(self.lengths[i])
+            full = self.batch_size and len(batch) >= self.batch_size
+            over = self.max_frames and (len(batch) + 1) * max(longest, length) > self.max_frames
+            if batch and (full or over):
+                batches.append(np.array(batch))
+                batch, longest = [], 0
+            batch.append(i)
+            longest = max(longest, length)
+        if batch:
+            batches.append(np.array(batch))
+        return batches
+
+    def make_batches(self):
+        rng = np.random.default_rng(None if self.seed is None else self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        mean_length = max(1, int(self.lengths.mean())) if len(self.lengths) else 1
+        mean_batch = self.batch_size or max(1, self.max_frames // mean_length)
+        pool = POOL_BATCHES * mean_batch
+        batches = []
+        for start in range(0, len(order), pool):
+            chunk = order[start:start + pool]
+            batches.extend(self.cut(chunk[np.argsort(self.lengths[chunk], kind="stable")]))
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        if self.verbose and batches:
+            baseline = [order[i:i + mean_batch] for i in range(0, len(order), mean_batch)]
+            print(f" > Epoch {self.epoch}: {len(batches)} bucketed batches of {len(order) / len(batches):.1f} "
+                  f"utterances, padding efficiency {padding_efficiency(batches, self.lengths):.1%} "
+                  f"(random batches: {padding_efficiency(baseline, self.lengths):.1%}).")
+        return batches
+
+    def __len__(self):
+        if self.batches is None:
+            self.batches = self.make_batches()
+        return len(self.batches)
+
+    def __iter__(self):
+        if self.batches is None:
+            self.batches = self.make_batches()
+        batches, self.batches = self.batches, None
+        self.epoch += 1
+        for batch in batches:
+            yield batch.tolist()
+
+# --------------------------------------------------------------------
+# 3. Training integration
+# --------------------------------------------------------------------
+
+def item_frames(items, corpus, hop_length=HOP_LENGTH):
+    """
+    Mel frames of each formatter item, from the sample counts of a packed
+    waveform corpus; items missing from it are estimated from their file
+    size as 16-bit audio.
+    """
+    frames = []
+    for item in items:
+        path = item["audio_file"]
+        samples = len(corpus.samples(path)) if path in corpus else os.path.getsize(path) // 2
+        frames.append(samples // hop_length + 1)
+    return np.array(frames, dtype=np.int64)
+
+def attach_to_model(model, corpus, max_frames=None, seed=0):
+    """
+    Make model.get_data_loader() batch with a DurationBucketSampler: batches
+    of at most config.batch_size (eval_batch_size) utterances and, when
+    given, max_frames padded frames. The loader that Coqui builds is kept
+    for its dataset, collate function and workers. Multi-GPU runs keep
+    Coqui's own sampler.
+    """
+    original = model.get_data_loader
+    calls = {False: 0, True: 0}
+
+    def get_data_loader(config, assets, is_eval, samples, verbose, num_gpus, rank=None):
+        from torch.utils.data import DataLoader
+
+        loader = original(config, assets, is_eval, samples, verbose, num_gpus, rank)
+        if num_gpus > 1:
+            return loader
+        dataset = loader.dataset
+        sampler = DurationBucketSampler(
+            item_frames(dataset.samples, corpus, config.audio.hop_length),
+            batch_size=config.eval_batch_size if is_eval else config.batch_size,
+            max_frames=max_frames,
+            shuffle=not is_eval,
+            seed=seed + calls[is_eval],
+            verbose=verbose,
+        )
+        calls[is_eval] += 1
+        return DataLoader(dataset, batch_sampler=sampler, collate_fn=loader.collate_fn,
+                          num_workers=loader.num_workers, pin_memory=loader.pin_memory)
+
+    model.get_data_loader = get_data_loader
+    return model
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the padding efficiency of duration-bucketed batches.")
+    parser.add_argument("--metadata", type=str, default=METADATA_FILE, help="metadata.csv with a duration column.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Utterances per batch (0 for no limit).")
+    parser.add_argument("--max-frames", type=int, default=None, help="Padded mel frames per batch.")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE, help="Sample rate of the training audio.")
+    parser.add_argument("--hop-length", type=int, default=HOP_LENGTH, help="Mel hop length in samples.")
+    parser.add_argument("--epochs", type=int, default=2, help="Epochs to sample.")
+    args = parser.parse_args()
+
+    index = load_index(args.metadata)
+    known = np.isfinite(index.durations)
+    if not known.any():
+        print(f"No durations in {args.metadata}; regenerate it with generate_data.py.")
+        return
+    if not known.all():
+        print(f"Skipping {np.sum(~known)} rows without a duration.")
+    lengths = (index.durations[known] * args.sample_rate).astype(np.int64) // args.hop_length + 1
+    sampler = DurationBucketSampler(lengths, batch_size=args.batch_size or None, max_frames=args.max_frames, seed=0)
+    for _ in range(args.epochs):
+        for _ in sampler:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import hashlib
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+# Length of the character shingles compared between sentences.
+SHINGLE_SIZE = 5
+# Number of MinHash permutations per signature (split into LSH bands).
+NUM_PERMUTATIONS = 64
+# Estimated Jaccard similarity above which two sentences are near duplicates.
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Sentences hashed together in one vectorized pass.
+BATCH_SIZE = 100_000
+
+# Multiplier of the rolling polynomial hash over shingle code points.
+SHINGLE_BASE = 1_000_003
+
+# --------------------------------------------------------------------
+# 2. Hashing helpers
+# --------------------------------------------------------------------
+
+def exact_hash(sentence):
+    """
+    Return a 64-bit content hash of a sentence.
+    """
+    return int.from_bytes(hashlib.blake2b(sentence.encode("utf-8"), digest_size=8).digest(), "little")
+
+def lsh_bands(num_perm, threshold):
+    """
+    Return (bands, rows) with bands * rows == num_perm whose LSH threshold
+    (1 / bands) ** (1 / rows) is closest to the requested similarity threshold.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+def shingle_hashes(sentences, shingle_size=SHINGLE_SIZE):
+    """
+    Hash every character shingle of every (lowercased) sentence in one pass.
+    Returns the 64-bit shingle hashes, concatenated sentence by sentence, and
+    the index where each sentence's shingles start. Sentences shorter than
+    shingle_size are padded with spaces so that each has at least one shingle.
+    """
+    texts = [s.lower().ljust(shingle_size) for s in sentences]
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+    # Rolling polynomial hash of each window of shingle_size code points.
+    windows = len(codes) - shingle_size + 1
+    hashes = np.zeros(windows, dtype=np.uint64)
+    for t in range(shingle_size):
+        hashes += codes[t:t + windows] * np.uint64(SHINGLE_BASE ** t % 2**64)
+
+    # Keep only the windows that lie inside a single sentence.
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = lengths - shingle_size + 1
+    owner = np.repeat(np.arange(len(texts)), lengths)[:windows]
+    valid = np.arange(windows) - starts[owner] < counts[owner]
+    segment_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return hashes[valid], segment_starts
+
+# --------------------------------------------------------------------
+# 3. Duplicate index
+# --------------------------------------------------------------------
+
+class SentenceDeduplicator:
+    """
+    Streaming index of exact and near-duplicate sentences.
+
+    Exact duplicates are caught with a set of 64-bit content hashes. Near
+    duplicates are caught with MinHash signatures over character shingles
+    and an LSH band index; candidates are confirmed by comparing signatures.
+    Sentences are fed in order with filter(); a sentence is dropped when it
+    repeats, or is similar to, a sentence kept earlier. Only the hashes,
+    signatures and band keys of kept sentences are held in memory.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, num_perm=NUM_PERMUTATIONS,
+                 shingle_size=SHINGLE_SIZE, seed=0):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.increments = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self.band_mix = rng.integers(1, 2**63, self.rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+        self.exact = set()
+        self.signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self.kept = 0
+        # Per band: sorted keys and the id of the first kept sentence with that key.
+        self.band_keys = [np.empty(0, dtype=np.uint64) for _ in range(self.bands)]
+        self.band_ids = [np.empty(0, dtype=np.int64) for _ in range(self.bands)]
+
+        self.seen = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.removed_characters = 0
+
+    def minhash(self, sentences):
+        """
+        Return the (len(sentences), num_perm) uint32 MinHash signatures.
+        """
+        hashes, segment_starts = shingle_hashes(sentences, self.shingle_size)
+        signatures = np.empty((len(sentences), self.num_perm), dtype=np.uint32)
+        for j in range(self.num_perm):
+            values = (hashes * self.multipliers[j] + self.increments[j]) >> np.uint64(32)
+            signatures[:, j] = np.minimum.reduceat(values, segment_starts)
+        return signatures
+
+    def band_key(self, signatures, band):
+        columns = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+        return (columns * self.band_mix).sum(axis=1, dtype=np.uint64)
+
+    def similar(self, left, right):
+        """
+        Return which rows of two signature arrays estimate a Jaccard similarity
+        of at least the threshold.
+        """
+        return (left == right).mean(axis=1) >= self.threshold
+
+    def filter(self, sentences):
+        """
+        Return a boolean array marking which of the given sentences to keep,
+        and add the kept ones to the index.
+        """
+        keep = np.ones(len(sentences), dtype=bool)
+        self.seen += len(sentences)
+
+        # 1) Exact duplicates, against everything seen so far.
+        for i, sentence in enumerate(sentences):
+            key = exact_hash(sentence)
+            if key in self.exact:
+                keep[i] = False
+                self.exact_duplicates += 1
+                self.removed_characters += len(sentence)
+            else:
+                self.exact.add(key)
+
+        candidates = np.flatnonzero(keep)
+        if len(candidates) == 0:
+            return keep
+        signatures = self.minhash([sentences[i] for i in candidates])
+        keys = [self.band_key(signatures, band) for band in range(self.bands)]
+
+        # 2) Near duplicates of sentences kept in earlier batches.
+        near = np.zeros(len(candidates), dtype=bool)
+        for band in range(self.bands):
+            index_keys, index_ids = self.band_keys[band], self.band_ids[band]
+            if len(index_keys) == 0:
+                continue
+            pos = np.minimum(np.searchsorted(index_keys, keys[band]), len(index_keys) - 1)
+            hit = np.flatnonzero(~near & (index_keys[pos] == keys[band]))
+            if len(hit):
+                matched = self.signatures[index_ids[pos[hit]]]
+                near[hit[self.similar(signatures[hit], matched)]] = True
+
+        # 3) Near duplicates within this batch: compare each sentence with the
+        #    first sentence of its LSH bucket, in order, if that one was kept.
+        first_in_bucket = np.full((len(candidates), self.bands), -1, dtype=np.int64)
+        for band in range(self.bands):
+            _, first, inverse = np.unique(keys[band], return_index=True, return_inverse=True)
+            rep = first[inverse]
+            later = rep < np.arange(len(candidates))
+            first_in_bucket[later, band] = rep[later]
+        for j in np.flatnonzero((first_in_bucket >= 0).any(axis=1)):
+            if near[j]:
+                continue
+            for rep in first_in_bucket[j]:
+                if rep >= 0 and not near[rep] and self.similar(signatures[j:j + 1], signatures[rep:rep + 1])[0]:
+                    near[j] = True
+                    break
+
+        for j in np.flatnonzero(near):
+            self.removed_characters += len(sentences[candidates[j]])
+        self.near_duplicates += int(near.sum())
+        keep[candidates[near]] = False
+
+        self.add(signatures[~near], [k[~near] for k in keys])
+        return keep
+
+    def add(self, signatures, keys):
+        """
+        Store the signatures and band keys of newly kept sentences.
+        """
+        ids = np.arange(self.kept, self.kept + len(signatures))
+        if self.kept + len(signatures) > len(self.signatures):
+            capacity = max(2 * len(self.signatures), self.kept + len(signatures))
+            grown = np.empty((capacity, self.num_perm), dtype=np.uint32)
+            grown[:self.kept] = self.signatures[:self.kept]
+            self.signatures = grown
+        self.signatures[self.kept:self.kept + len(signatures)] = signatures
+        self.kept += len(signatures)
+
+        for band in range(self.bands):
+            # Both arrays stay sorted by key with the earliest id first, so the
+            # stable sort of two sorted runs is a linear merge.
+            merged_keys = np.concatenate((self.band_keys[band], keys[band]))
+            merged_ids = np.concatenate((self.band_ids[band], ids))
+            order = np.argsort(merged_keys, kind="stable")
+            merged_keys, merged_ids = merged_keys[order], merged_ids[order]
+            first = np.ones(len(merged_keys), dtype=bool)
+            first[1:] = merged_keys[1:] != merged_keys[:-1]
+            self.band_keys[band], self.band_ids[band] = merged_keys[first], merged_ids[first]
+
+    def report(self, seconds_per_character):
+        """
+        Print how many sentences were removed and the audio they would have cost.
+        """
+        removed = self.exact_duplicates + self.near_duplicates
+        saved_seconds = self.removed_characters * seconds_per_character
+        print(
+            f"Deduplication removed {removed} of {self.seen} sentences "
+            f"({self.exact_duplicates} exact, {self.near_duplicates} near duplicates), "
+            f"saving about {saved_seconds:.0f} seconds ({saved_seconds / 3600:.2f} hours) of audio."
+        )
+
+def iter_deduplicated(sentences, deduplicator, batch_size=BATCH_SIZE):
+    """
+    Stream sentences from any iterable, dropping duplicates batch by batch.
+    """
+    batch = []
+    for sentence in sentences:
+        batch.append(sentence)
+        if len(batch) == batch_size:
+            yield from (s for s, k in zip(batch, deduplicator.filter(batch)) if k)
+            batch = []
+    if batch:
+        yield from (s for s, k in zip(batch, deduplicator.filter(batch)) if k)
+
+def deduplicate(sentences, threshold=NEAR_DUPLICATE_THRESHOLD, batch_size=BATCH_SIZE):
+    """
+    Return the deduplicated list of sentences, keeping first occurrences,
+    together with the SentenceDeduplicator holding the statistics.
+    """
+    deduplicator = SentenceDeduplicator(threshold=threshold)
+    return list(iter_deduplicated(sentences, deduplicator, batch_size)), deduplicator
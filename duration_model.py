@@ -0,0 +1,152 @@
+import os
+import re
+import csv
+import wave
+import argparse
+import numpy as np
+from process_text import SECONDS_PER_CHARACTER
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+METADATA_FILE = os.path.join("output_audio", "metadata.csv")
+
+# Features of a sentence, in the order of the model's coefficients.
+FEATURES = ("intercept", "characters", "words", "digits", "numbers", "pauses")
+# Below this many calibration rows the default character-count model is kept.
+MIN_CALIBRATION_ROWS = 50
+# Fraction of the calibration rows held out to measure accuracy.
+HOLDOUT_FRACTION = 0.2
+# Predictions never go below this many seconds.
+MIN_SECONDS = 0.5
+
+NUMBER = re.compile(r"\d+")
+PAUSE = re.compile(r"[,;:—–]")
+
+# --------------------------------------------------------------------
+# 2. Features and model
+# --------------------------------------------------------------------
+
+def sentence_features(texts):
+    """
+    Return the (len(texts), len(FEATURES)) feature matrix. Digits get their
+    own features because a spoken number is much longer than its characters.
+    """
+    rows = np.empty((len(texts), len(FEATURES)))
+    for i, text in enumerate(texts):
+        numbers = NUMBER.findall(text)
+        rows[i] = (1.0, len(text), len(text.split()), sum(map(len, numbers)), len(numbers),
+                   len(PAUSE.findall(text)))
+    return rows
+
+class DurationModel:
+    """
+    Linear predictor of a sentence's audio duration in seconds. Without
+    calibration it is the repo-wide estimate of SECONDS_PER_CHARACTER per
+    character.
+    """
+
+    def __init__(self, coefficients=None):
+        if coefficients is None:
+            coefficients = np.zeros(len(FEATURES))
+            coefficients[FEATURES.index("characters")] = SECONDS_PER_CHARACTER
+        self.coefficients = np.asarray(coefficients, dtype=float)
+
+    @classmethod
+    def fit(cls, texts, seconds):
+        coefficients, *_ = np.linalg.lstsq(sentence_features(texts), np.asarray(seconds, dtype=float), rcond=None)
+        return cls(coefficients)
+
+    def predict(self, texts):
+        return np.maximum(sentence_features(texts) @ self.coefficients, MIN_SECONDS)
+
+    def predict_one(self, text):
+        return float(self.predict([text])[0])
+
+def accuracy(model, texts, seconds):
+    """
+    Return the mean absolute error in seconds and the mean absolute
+    percentage error of the model's predictions.
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    errors = np.abs(model.predict(texts) - seconds)
+    return float(errors.mean()), float((errors / np.maximum(seconds, MIN_SECONDS)).mean())
+
+# --------------------------------------------------------------------
+# 3. Calibration
+# --------------------------------------------------------------------
+
+def wav_seconds(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+def read_durations(metadata_file=METADATA_FILE):
+    """
+    Return (texts, seconds) for the rows of metadata_file whose duration is
+    known: from a "duration" column when the file has one, otherwise from the
+    header of the wav file next to it. Rows without audio are skipped.
+    """
+    root = os.path.dirname(metadata_file)
+    texts, seconds = [], []
+    with open(metadata_file, "r", encoding="utf-8", newline="") as infile:
+        for row in csv.DictReader(infile):
+            try:
+                value = float(row["duration"]) if row.get("duration") else wav_seconds(os.path.join(root, row["path"]))
+            except (OSError, EOFError, ValueError, wave.Error):
+                continue
+            if value > 0:
+                texts.append(row["sentence"])
+                seconds.append(value)
+    return texts, seconds
+
+def calibrate(metadata_file=METADATA_FILE, seed=0):
+    """
+    Fit a DurationModel on the synthesized audio listed in metadata_file.
+    Accuracy is measured on a held-out fraction of the rows, for both the
+    fitted model and the default character-count model, before refitting on
+    all rows. Returns the model and the accuracy report (None when there is
+    too little audio to calibrate on, in which case the default is returned).
+    """
+    texts, seconds = read_durations(metadata_file) if os.path.exists(metadata_file) else ([], [])
+    if len(texts) < MIN_CALIBRATION_ROWS:
+        print(f"Only {len(texts)} sentences with known duration; using {SECONDS_PER_CHARACTER} s per character.")
+        return DurationModel(), None
+
+    order = np.random.default_rng(seed).permutation(len(texts))
+    held_out = max(int(len(texts) * HOLDOUT_FRACTION), 1)
+    test, train = order[:held_out], order[held_out:]
+    test_texts = [texts[i] for i in test]
+    test_seconds = [seconds[i] for i in test]
+    fitted = DurationModel.fit([texts[i] for i in train], [seconds[i] for i in train])
+    report = {
+        "rows": len(texts),
+        "held_out": held_out,
+        "model": accuracy(fitted, test_texts, test_seconds),
+        "baseline": accuracy(DurationModel(), test_texts, test_seconds),
+    }
+    return DurationModel.fit(texts, seconds), report
+
+def print_report(report):
+    mae, mape = report["model"]
+    base_mae, base_mape = report["baseline"]
+    print(f"Duration model calibrated on {report['rows']} sentences; on {report['held_out']} held out: "
+          f"MAE {mae:.2f} s ({mape:.1%}), character-count baseline MAE {base_mae:.2f} s ({base_mape:.1%}).")
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the audio duration predictor and report its accuracy.")
+    parser.add_argument("--metadata", type=str, default=METADATA_FILE, help="metadata.csv of synthesized audio.")
+    args = parser.parse_args()
+
+    model, report = calibrate(args.metadata)
+    if report:
+        print_report(report)
+    for name, coefficient in zip(FEATURES, model.coefficients):
+        print(f"{name:>12}: {coefficient:.4f}")
+
+if __name__ == "__main__":
+    main()
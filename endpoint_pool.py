@@ -0,0 +1,217 @@
+import json
+import time
+import threading
+from synthesis_engine import (
+    FAILED, MAX_CONCURRENT_REQUESTS, OK, RETRY, THROTTLED, TRANSACTIONS_PER_SECOND, BURST_SECONDS, AIMDController,
+)
+from tts_backends import ENDPOINT_ERRORS, ENV_FILE, TTSBackend, make_backend
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+# Consecutive endpoint faults that take an endpoint out of rotation: retryable
+# errors, and failures whose error is one of ENDPOINT_ERRORS. Throttling and
+# failures of a single sentence (e.g. a bad request) do not count.
+DRAIN_AFTER_FAILURES = 5
+# Seconds a drained endpoint rests before it is probed again; doubled on
+# every drain in a row, up to DRAIN_MAX_SECONDS.
+DRAIN_SECONDS = 15.0
+DRAIN_MAX_SECONDS = 240.0
+
+# --------------------------------------------------------------------
+# 2. Rate limiting
+# --------------------------------------------------------------------
+
+class BlockingTokenBucket:
+    """
+    Thread-safe token bucket for calls made from worker threads: take()
+    blocks until a token is available. Same refill rule as the asyncio
+    TokenBucket in synthesis_engine.py.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate * BURST_SECONDS, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        # The token is reserved; sleeping outside the lock keeps arrival order.
+        if wait:
+            time.sleep(wait)
+
+# --------------------------------------------------------------------
+# 3. Endpoints
+# --------------------------------------------------------------------
+
+class Endpoint:
+    """
+    One subscription (key and region) or service: its backend, its own
+    token bucket and adaptive concurrency limit, and its health. An
+    endpoint with DRAIN_AFTER_FAILURES faults in a row is drained: it gets
+    no requests until drained_until, and then one probe at a time until a
+    request succeeds again.
+    """
+
+    def __init__(self, name, backend, tps=TRANSACTIONS_PER_SECOND, concurrency=MAX_CONCURRENT_REQUESTS):
+        self.name = name
+        self.backend = backend
+        self.tps = tps
+        self.concurrency = concurrency
+        self.bucket = BlockingTokenBucket(tps)
+        self.controller = AIMDController(maximum=concurrency)
+        self.in_flight = 0
+        self.failures_in_row = 0
+        self.drains_in_row = 0
+        self.drained_until = 0.0
+        self.counts = {OK: 0, THROTTLED: 0, RETRY: 0, FAILED: 0}
+        self.drains = 0
+
+    def healthy(self, now):
+        return self.drained_until <= now
+
+    def load(self):
+        return self.in_flight / self.controller.allowed
+
+    def has_room(self):
+        return self.in_flight < self.controller.allowed
+
+    def record(self, outcome, latency, now, error=None):
+        self.counts[outcome] += 1
+        self.controller.record(outcome, latency)
+        if outcome == OK:
+            self.failures_in_row = 0
+            self.drains_in_row = 0
+        elif outcome == RETRY or (outcome == FAILED and str(error or "").startswith(ENDPOINT_ERRORS)):
+            self.failures_in_row += 1
+            # Requests still in flight when the endpoint was drained do not extend the drain.
+            if self.failures_in_row >= DRAIN_AFTER_FAILURES and self.healthy(now):
+                self.drain(now)
+
+    def drain(self, now):
+        self.drained_until = now + min(DRAIN_SECONDS * 2 ** self.drains_in_row, DRAIN_MAX_SECONDS)
+        self.drains_in_row += 1
+        self.drains += 1
+        # Come back with a single probe request and grow from there.
+        self.controller.limit = float(self.controller.minimum)
+
+    def stats(self, elapsed):
+        requests = sum(self.counts.values())
+        errors = self.counts[RETRY] + self.counts[FAILED]
+        return {
+            "requests": requests,
+            "ok": self.counts[OK],
+            "throttled": self.counts[THROTTLED],
+            "errors": errors,
+            "error_rate": errors / requests if requests else 0.0,
+            "throughput": self.counts[OK] / elapsed if elapsed else 0.0,
+            "drains": self.drains,
+            "concurrency": self.controller.allowed,
+        }
+
+class EndpointPool(TTSBackend):
+    """
+    Fans requests out over several endpoints of the same voice and output
+    format, so that throughput adds up across subscriptions. Every request
+    goes to the least-loaded healthy endpoint (requests in flight relative
+    to its concurrency limit), waits for that endpoint's token bucket, and
+    its outcome updates that endpoint's limit and health only. The engine
+    above sees one backend with the summed TPS and concurrency.
+    """
+
+    name = "pool"
+
+    def __init__(self, endpoints):
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint.")
+        formats = {(e.backend.voice, e.backend.output_format) for e in endpoints}
+        if len(formats) > 1:
+            raise ValueError(f"Endpoints must share one voice and output format, got {sorted(formats)}")
+        self.endpoints = endpoints
+        self.voice, self.output_format = formats.pop()
+        self.max_batch_size = min(e.backend.max_batch_size for e in endpoints)
+        self.tps = sum(e.tps for e in endpoints)
+        self.concurrency = sum(e.concurrency for e in endpoints)
+        self.condition = threading.Condition()
+        self.started = time.monotonic()
+
+    def claim(self):
+        """
+        Reserve a request slot on the least-loaded healthy endpoint, waiting
+        for one to free up (or for a drained endpoint to come back).
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                candidates = [e for e in self.endpoints if e.healthy(now) and e.has_room()]
+                if candidates:
+                    endpoint = min(candidates, key=Endpoint.load)
+                    endpoint.in_flight += 1
+                    return endpoint
+                drained = [e.drained_until - now for e in self.endpoints if not e.healthy(now)]
+                self.condition.wait(timeout=min(drained, default=1.0))
+
+    def synthesize(self, texts):
+        endpoint = self.claim()
+        endpoint.bucket.take()
+        start = time.perf_counter()
+        try:
+            result, error = endpoint.backend.synthesize(texts), None
+        except Exception as e:
+            result, error = None, e
+        latency = time.perf_counter() - start
+        with self.condition:
+            endpoint.in_flight -= 1
+            if error is not None:
+                endpoint.record(RETRY, latency, time.monotonic(), error)
+            else:
+                endpoint.record(result.status, latency, time.monotonic(), result.error)
+            self.condition.notify_all()
+        if error is not None:
+            raise error
+        return result
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.backend.close()
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {endpoint.name: endpoint.stats(elapsed) for endpoint in self.endpoints}
+
+    def summary(self):
+        lines = []
+        for name, s in self.stats().items():
+            lines.append(f"{name}: {s['ok']} ok of {s['requests']} requests ({s['throughput']:.1f}/s), "
+                         f"{s['throttled']} throttled, {s['error_rate']:.1%} errors, {s['drains']} drains, "
+                         f"concurrency {s['concurrency']}")
+        return "\n".join(lines)
+
+def load_endpoints(path, default_backend="azure", env_file=ENV_FILE):
+    """
+    Build an EndpointPool from a JSON list of endpoints. Every entry may set
+    "name", "backend" (default_backend if missing), "tps" and "concurrency";
+    the remaining keys go to the backend, e.g. "speech_key" and
+    "service_region" for Azure or "capacity" for the mock.
+    """
+    with open(path, "r", encoding="utf-8") as infile:
+        entries = json.load(infile)
+    endpoints = []
+    for i, entry in enumerate(entries):
+        options = dict(entry)
+        name = options.pop("name", None)
+        backend_name = options.pop("backend", default_backend)
+        tps = options.pop("tps", TRANSACTIONS_PER_SECOND)
+        concurrency = options.pop("concurrency", MAX_CONCURRENT_REQUESTS)
+        if not name:
+            name = f"{backend_name}-{i + 1}" + (f" ({options['service_region']})" if "service_region" in options else "")
+        endpoints.append(Endpoint(name, make_backend(backend_name, env_file, **options), tps, concurrency))
+    return EndpointPool(endpoints)
@@ -1,140 +1,365 @@
 import os
 import re
-import csv
 import time
-import random
-import logging
-import concurrent.futures
-from dotenv import dotenv_values
-import azure.cognitiveservices.speech as speechsdk
+import socket
+import threading
+import functools
+import argparse
+import numpy as np
+from shard_sentences import read_shard
+from duration_model import METADATA_FILE, accuracy, calibrate, print_report
+from audio_tools import audio_problem, wav_stats
+from synthesis_engine import (
+    MAX_CONCURRENT_REQUESTS, OK, RETRY, TRANSACTIONS_PER_SECOND, AIMDController, BatchedWavWriter, run,
+)
+from tts_backends import BACKENDS, ENV_FILE, Synthesis, make_backend
+from endpoint_pool import load_endpoints
+from job_journal import JOURNAL_FILE, LEASE_SECONDS, LEASED, WORKER_COMMIT_EVERY, JobJournal, open_journal
+from audio_cache import CACHE_DIR, AudioCache
 
 # --------------------
 # Configuration
 # --------------------
-config = dotenv_values("configs/.env")
-speech_key = config["speech_key"]
-service_region = config["service_region"]
 
-speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
-speech_config.set_speech_synthesis_output_format(
-    speechsdk.SpeechSynthesisOutputFormat.Riff22050Hz16BitMonoPcm
-)
-speech_config.speech_synthesis_voice_name = "bg-BG-KalinaNeural"
+# Sentences packed into one request (1 sends every sentence on its own).
+SSML_BATCH_SIZE = 1
+# Most characters packed into one request.
+SSML_BATCH_CHARACTERS = 600
 
-MAX_CONCURRENT_REQUESTS = 64 # Azure TTS limit is 200 transactions per second (TPS) for Standard S0 tier
+output_folder = "output_audio"
+metadata_file = METADATA_FILE
 
 # --------------------
-# File and Folder Setup
+# Helper Functions
 # --------------------
-input_file = os.path.join("data", "sentences.txt")
-try:
-    with open(input_file, "r", encoding="utf-8") as file:
-        sentences = [line.strip() for line in file if line.strip()]
-except FileNotFoundError:
-    print(f"Error: Could not find {input_file}")
-    exit(1)
+def load_sentences(args):
+    """
+    Return (idx, text) pairs to synthesize. Shard sentences carry their own
+    global ids; plain input sentences have idx None and get theirs from the
+    journal.
+    """
+    input_file = args.shard or args.input
+    try:
+        if args.shard:
+            return read_shard(input_file)
+        with open(input_file, "r", encoding="utf-8") as file:
+            return [(None, line.strip()) for line in file if line.strip()]
+    except FileNotFoundError:
+        print(f"Error: Could not find {input_file}")
+        exit(1)
 
-output_folder = "output_audio"
-os.makedirs(output_folder, exist_ok=True)
-metadata_file = os.path.join(output_folder, "metadata.csv")
-
-# Find the highest existing file index to avoid overwriting files.
-existing_files = [
-    f for f in os.listdir(output_folder)
-    if f.startswith("sentence") and f.endswith(".wav")
-]
-existing_indexes = [
-    int(re.search(r"sentence(\d+)\.wav", f).group(1))
-    for f in existing_files if re.search(r"sentence(\d+)\.wav", f)
-]
-start_idx = max(existing_indexes) + 1 if existing_indexes else 1
+def next_free_index(folder=output_folder):
+    """
+    The index after the highest existing wav file, so that new sentences
+    never overwrite audio the journal does not know about.
+    """
+    existing_files = [
+        f for f in os.listdir(folder)
+        if f.startswith("sentence") and f.endswith(".wav")
+    ]
+    existing_indexes = [
+        int(re.search(r"sentence(\d+)\.wav", f).group(1))
+        for f in existing_files if re.search(r"sentence(\d+)\.wav", f)
+    ]
+    return max(existing_indexes) + 1 if existing_indexes else 1
 
-# --------------------
-# Helper Function
-# --------------------
-def synthesize_speech(text: str, filepath: str) -> speechsdk.SpeechSynthesisResult:
-    """
-    Synthesize the given text to the specified file path using Azure TTS.
-    Returns the SpeechSynthesisResult object.
-    """
-    audio_config = speechsdk.audio.AudioOutputConfig(filename=filepath)
-    synthesizer = speechsdk.SpeechSynthesizer(
-        speech_config=speech_config, audio_config=audio_config
-    )
-    # Small delay before each request to avoid overwhelming the service.
-    time.sleep(2)
-    
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            result = synthesizer.speak_text_async(text).get()
-            return result
-        except Exception as e:
-            logging.error(f"Attempt {attempt + 1} failed for \"{text}\": {e}")
-            if attempt < max_retries - 1:
-                sleep_duration = (2 ** attempt) + random.random()  # Exponential backoff with jitter
-                logging.info(f"Retrying in {sleep_duration:.2f} seconds...")
-                time.sleep(sleep_duration)
-            else:
-                logging.error(f"Max retries reached for \"{text}\".")
-                raise  # Re-raise the exception if all retries failed
+def classify_result(outcome, error):
+    """
+    The engine's label for one attempt: the backend's own status, or a
+    retry when the request raised.
+    """
+    return RETRY if error is not None else outcome.status
 
-# --------------------
-# Main Logic with Parallel Execution
-# --------------------
-file_exists = os.path.exists(metadata_file)
+def fetch_cached(sentences, cache, journal, folder=output_folder, owner=None):
+    """
+    Fill in every sentence already in the audio cache from there, marking it
+    done in the journal (as owner of its lease, in worker mode), and return
+    the ones that still need synthesis.
+    """
+    remaining = []
+    for idx, text in sentences:
+        filepath = os.path.join(folder, f"sentence{idx}.wav")
+        if cache.fetch(text, filepath):
+            with open(filepath, "rb") as f:
+                journal.mark_done(idx, wav_stats(f.read(), text), owner)
+        else:
+            remaining.append((idx, text))
+    journal.commit()
+    print(f"Reused {cache.hits} sentences from the audio cache; {len(remaining)} left to synthesize.")
+    return remaining
 
-# Collect results in memory before writing to CSV to avoid concurrency issues
-csv_records = []
+def schedule_longest_first(sentences, model):
+    """
+    Return (idx, text, predicted_seconds) jobs ordered by predicted audio
+    duration, longest first (LPT), so that no long sentence is left to run
+    alone at the end of the batch.
+    """
+    jobs = list(sentences)
+    predicted = model.predict([text for _, text in jobs]) if jobs else np.empty(0)
+    order = np.argsort(-predicted, kind="stable")
+    return [(jobs[i][0], jobs[i][1], float(predicted[i])) for i in order]
 
-with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
-    # Map each future (TTS job) back to its metadata
-    future_to_data = {}
+def pack_batches(jobs, batch_size=SSML_BATCH_SIZE, max_characters=SSML_BATCH_CHARACTERS):
+    """
+    Group consecutive jobs into requests of at most batch_size sentences and
+    max_characters characters, keeping the longest-first order.
+    """
+    batch, characters = [], 0
+    for job in jobs:
+        if batch and (len(batch) == batch_size or characters + len(job[1]) > max_characters):
+            yield batch
+            batch, characters = [], 0
+        batch.append(job)
+        characters += len(job[1])
+    if batch:
+        yield batch
 
-    for idx, text in enumerate(sentences, start=start_idx):
-        filename = f"sentence{idx}.wav"
-        filepath = os.path.join(output_folder, filename)
+def synthesize_jobs(jobs, backend, journal, folder=output_folder, cache=None, tps=TRANSACTIONS_PER_SECOND,
+                    concurrency=MAX_CONCURRENT_REQUESTS, adaptive=True, batch_size=SSML_BATCH_SIZE, verbose=True,
+                    controller=None, owner=None):
+    """
+    Synthesize scheduled (idx, text, predicted_seconds) jobs with the backend
+    into folder/sentence{idx}.wav, recording every outcome in the journal and
+    every new wav in the cache. Every wav is measured in memory as it
+    arrives (audio_tools.audio_stats), and a request with an empty or
+    truncated wav is retried like a failed one. In worker mode, owner is the
+    worker id, and only sentences it still holds the lease of are updated.
+    Returns the run statistics.
+    """
+    batch_size = min(batch_size, backend.max_batch_size)
+    if controller is None and adaptive:
+        controller = AIMDController(maximum=concurrency)
+    writer = BatchedWavWriter()
+    predicted, measured, measured_texts = [], [], []
+    rejected = []
 
-        # Skip if file already exists
-        if os.path.exists(filepath):
-            print(f"Skipping existing file: {filename}")
-            continue
+    def finished(idx, text, filepath, stats):
+        journal.mark_done(idx, stats, owner)
+        if cache:
+            # The wav and its journal entry are already safe; a cache that
+            # cannot take a copy (e.g. a full disk) only costs a future hit.
+            try:
+                cache.store(text, filepath)
+            except Exception as e:
+                print(f"Could not cache {filepath}: {e}")
 
-        future = executor.submit(synthesize_speech, text, filepath)
-        future_to_data[future] = (text, filename)
+    def synthesize(batch):
+        outcome = backend.synthesize([text for _, text, _ in batch])
+        if outcome.status != OK:
+            return outcome
+        stats = [wav_stats(audio, text) for (_, text, _), audio in zip(batch, outcome.audio)]
+        problems = [f"sentence{idx}.wav {problem}"
+                    for (idx, _, _), s in zip(batch, stats) if (problem := audio_problem(s))]
+        if problems:
+            rejected.append(len(problems))
+            return Synthesis(RETRY, None, f"Audio check failed: {', '.join(problems)}")
+        return outcome._replace(stats=stats)
 
-    # Process completed futures as they finish
-    for future in concurrent.futures.as_completed(future_to_data):
-        text, filename = future_to_data[future]
-        filepath = os.path.join(output_folder, filename)
-        try:
-            result = future.result()
-            if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+    def on_result(batch, outcome, error):
+        if error is not None:
+            for idx, text, _ in batch:
+                print(f"Exception occurred while processing \"{text}\" -> {error}")
+                journal.mark_failed(idx, error, owner)
+            return
+        if outcome.status != OK:
+            print(f"Speech synthesis failed ({outcome.status}): {outcome.error}")
+            for idx, _, _ in batch:
+                journal.mark_failed(idx, outcome.error, owner)
+            return
+        for (idx, text, seconds), audio, stats in zip(batch, outcome.audio, outcome.stats):
+            filepath = os.path.join(folder, f"sentence{idx}.wav")
+            if verbose:
                 print(f"Speech synthesized to file: {filepath} for text: \"{text}\"")
-                csv_records.append((filename, text, "1"))
-            elif result.reason == speechsdk.ResultReason.Canceled:
-                cancellation_details = result.cancellation_details
-                print(f"Speech synthesis canceled: {cancellation_details.reason}")
-                if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                    if cancellation_details.error_details:
-                        print(f"Error details: {cancellation_details.error_details}")
-                print("Did you update the subscription info?")
-        except Exception as e:
-            print(f"Exception occurred while processing \"{text}\" -> {e}")
+            # The sentence is journaled as done only once its wav is on disk.
+            writer.write(filepath, audio, functools.partial(finished, idx, text, filepath, stats))
+            predicted.append(seconds)
+            measured.append(stats["duration"])
+            measured_texts.append(text)
+
+    try:
+        count, elapsed = run(pack_batches(jobs, batch_size), synthesize, on_result, tps=tps,
+                             concurrency=concurrency, controller=controller, classify=classify_result)
+    finally:
+        writer.close()
+        for path, e in writer.errors:
+            print(f"Error saving {path}: {e}")
+            journal.mark_failed(int(re.search(r"sentence(\d+)\.wav", path).group(1)), e, owner)
+        journal.commit()
+
+    return {
+        "requests": count,
+        "elapsed": elapsed,
+        "written": writer.written,
+        "write_batches": writer.batches,
+        "rejected": sum(rejected),
+        "controller": controller,
+        "predicted": predicted,
+        "measured": measured,
+        "measured_texts": measured_texts,
+    }
+
+def work_leases(backend, journal, worker_id, model, lease_size=256, lease_seconds=LEASE_SECONDS, cache=None,
+                tps=TRANSACTIONS_PER_SECOND, concurrency=MAX_CONCURRENT_REQUESTS, adaptive=True,
+                batch_size=SSML_BATCH_SIZE):
+    """
+    Worker loop over a journal shared with other workers: claim a lease of
+    lease_size sentences, synthesize them, and repeat until nothing is left
+    to claim and no other worker holds a lease. Leases are renewed in the
+    background while the worker is alive, and handed back when it stops.
+    Returns the summed run statistics.
+    """
+    controller = AIMDController(maximum=concurrency) if adaptive else None
+    totals = {"requests": 0, "elapsed": 0.0, "written": 0, "write_batches": 0, "rejected": 0, "sentences": 0,
+              "controller": controller, "predicted": [], "measured": [], "measured_texts": []}
+    stopped = threading.Event()
+
+    def renew_leases():
+        while not stopped.wait(lease_seconds / 3):
+            journal.renew(worker_id, lease_seconds)
+
+    renewer = threading.Thread(target=renew_leases, daemon=True)
+    renewer.start()
+    try:
+        while True:
+            sentences = journal.claim(worker_id, lease_size, lease_seconds)
+            if not sentences:
+                if journal.counts().get(LEASED, 0) == 0:
+                    break
+                # Other workers hold the rest; their leases finish or expire.
+                time.sleep(min(lease_seconds / 4, 30))
+                continue
+            print(f"Worker {worker_id} leased {len(sentences)} sentences.")
+            if cache:
+                sentences = fetch_cached(sentences, cache, journal, owner=worker_id)
+            jobs = schedule_longest_first(sentences, model)
+            stats = synthesize_jobs(jobs, backend, journal, cache=cache, tps=tps, concurrency=concurrency,
+                                    adaptive=adaptive, batch_size=batch_size, controller=controller,
+                                    owner=worker_id)
+            totals["sentences"] += len(jobs)
+            for key in ("requests", "elapsed", "written", "write_batches", "rejected",
+                        "predicted", "measured", "measured_texts"):
+                totals[key] += stats[key]
+    finally:
+        stopped.set()
+        renewer.join()
+        journal.release(worker_id)
+    return totals
 
 # --------------------
-# Write/Append to CSV
+# Main Logic with Parallel Execution
 # --------------------
-try:
-    with open(metadata_file, "a", newline="", encoding="utf-8") as csvfile:
-        csv_writer = csv.writer(csvfile, delimiter=",")
-        if not file_exists:
-            csv_writer.writerow(["path", "sentence", "speaker"])
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize sentences with a TTS backend (Azure by default).")
+    parser.add_argument("--input", type=str, default=os.path.join("data", "sentences.txt"),
+                        help="Sentences to synthesize, one per line (e.g. data/selected_sentences.txt).")
+    parser.add_argument("--shard", type=str, default=None,
+                        help="Shard file from shard_sentences.py; its global sentence ids name the wav files.")
+    parser.add_argument("--backend", type=str, default="azure", choices=BACKENDS,
+                        help="Synthesis backend; mock makes deterministic audio offline.")
+    parser.add_argument("--env-file", type=str, default=ENV_FILE, help="File with the backend keys.")
+    parser.add_argument("--endpoints", type=str, default=None,
+                        help="JSON list of endpoints (e.g. several Azure keys and regions) to fan requests out over.")
+    parser.add_argument("--coqui-model-path", type=str, default=None, help="Checkpoint for the coqui backend.")
+    parser.add_argument("--coqui-config-path", type=str, default=None, help="config.json for the coqui backend.")
+    parser.add_argument("--mock-latency", type=float, default=0.2, help="Seconds per request of the mock backend.")
+    parser.add_argument("--mock-jitter", type=float, default=0.05,
+                        help="Uniform jitter of the mock latency in seconds.")
+    parser.add_argument("--mock-failure-rate", type=float, default=0.0,
+                        help="Fraction of mock requests that fail and are retried.")
+    parser.add_argument("--mock-truncation-rate", type=float, default=0.0,
+                        help="Fraction of mock requests whose audio is cut short.")
+    parser.add_argument("--tps", type=float, default=TRANSACTIONS_PER_SECOND,
+                        help="Requests started per second (token-bucket rate).")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="Maximum requests in flight; the adaptive controller stays at or below it.")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="Always keep --concurrency requests in flight instead of adapting (AIMD).")
+    parser.add_argument("--batch-size", type=int, default=SSML_BATCH_SIZE,
+                        help="Sentences per request; Azure sends them as SSML split back apart at bookmarks.")
+    parser.add_argument("--journal", type=str, default=JOURNAL_FILE,
+                        help="SQLite journal of synthesis jobs, used to resume after a restart.")
+    parser.add_argument("--cache-dir", type=str, default=CACHE_DIR,
+                        help="Content-addressed audio cache checked before calling the backend.")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor fill the audio cache.")
+    parser.add_argument("--worker", action="store_true",
+                        help="Claim sentences from a shared journal (filled by job_journal.py --enqueue) "
+                             "instead of reading --input.")
+    parser.add_argument("--worker-id", type=str, default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Name of this worker in the journal's leases.")
+    parser.add_argument("--lease-size", type=int, default=256, help="Sentences claimed per lease.")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS,
+                        help="Seconds before an unrenewed lease can be claimed by another worker.")
+    args = parser.parse_args()
+
+    options = {}
+    if args.backend == "coqui":
+        options = {"model_path": args.coqui_model_path, "config_path": args.coqui_config_path}
+    elif args.backend == "mock":
+        options = {"latency": args.mock_latency, "jitter": args.mock_jitter, "failure_rate": args.mock_failure_rate,
+                   "truncation_rate": args.mock_truncation_rate}
+    if args.endpoints:
+        # Every endpoint has its own rate limit and adaptive concurrency.
+        backend = load_endpoints(args.endpoints, args.backend, args.env_file)
+        args.tps, args.concurrency, args.fixed_concurrency = backend.tps, backend.concurrency, True
+        print(f"Fanning out over {len(backend.endpoints)} endpoints: {backend.tps:.0f} requests per second, "
+              f"{backend.concurrency} in flight at most.")
+    else:
+        backend = make_backend(args.backend, args.env_file, **options)
+
+    os.makedirs(output_folder, exist_ok=True)
+    cache = None if args.no_cache else AudioCache(args.cache_dir, backend.voice, backend.output_format)
+    # Predict every sentence's duration from the audio synthesized so far.
+    model, report = calibrate(metadata_file)
+    if report:
+        print_report(report)
 
-        for record in csv_records:
-            csv_writer.writerow(record)
+    if args.worker:
+        # The coordinator merges metadata.csv with job_journal.py --export once every worker is done.
+        journal = JobJournal(args.journal, WORKER_COMMIT_EVERY)
+        try:
+            stats = work_leases(backend, journal, args.worker_id, model, args.lease_size, args.lease_seconds,
+                                cache=cache, tps=args.tps, concurrency=args.concurrency,
+                                adaptive=not args.fixed_concurrency, batch_size=args.batch_size)
+        finally:
+            backend.close()
+        total_jobs = stats["sentences"]
+    else:
+        journal = open_journal(args.journal, metadata_file)
+        try:
+            sentences = journal.assign(load_sentences(args), next_free_index())
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
+        if cache:
+            sentences = fetch_cached(sentences, cache, journal)
+        jobs = schedule_longest_first(sentences, model)
+        total_predicted = sum(job[2] for job in jobs)
+        print(f"Scheduled {len(jobs)} sentences, longest first: {total_predicted / 3600:.2f} predicted hours of audio.")
+
+        try:
+            stats = synthesize_jobs(jobs, backend, journal, cache=cache, tps=args.tps, concurrency=args.concurrency,
+                                    adaptive=not args.fixed_concurrency, batch_size=args.batch_size)
+        finally:
+            backend.close()
+            print(f"Metadata file updated from the journal: {journal.export_metadata(metadata_file)} rows in "
+                  f"{metadata_file}")
+        total_jobs = len(jobs)
 
-    print(f"Metadata file updated: {metadata_file}")
+    count, elapsed = stats["requests"], stats["elapsed"]
+    print(f"Wrote {stats['written']} wav files in {stats['write_batches']} batches; "
+          f"{stats['rejected']} empty or truncated wavs were sent again.")
+    print(f"Synthesized {stats['written']} of {total_jobs} sentences with {count} requests in {elapsed:.1f} seconds "
+          f"({count / max(elapsed, 1e-9):.1f} requests per second).")
+    if stats["controller"]:
+        print(f"Adaptive concurrency: {stats['controller'].summary()}")
+    if args.endpoints:
+        print(backend.summary())
+    print("Journal: " + ", ".join(f"{n} {state}" for state, n in sorted(journal.counts().items())))
+    if stats["measured"]:
+        mae, mape = accuracy(model, stats["measured_texts"], stats["measured"])
+        print(f"Predicted {sum(stats['predicted']) / 3600:.2f} hours, got {sum(stats['measured']) / 3600:.2f} hours "
+              f"(MAE {mae:.2f} s, {mape:.1%} per sentence).")
+    journal.close()
 
-except Exception as e:
-    print(f"Error writing to metadata file: {e}")
+if __name__ == "__main__":
+    main()
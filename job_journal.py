@@ -0,0 +1,355 @@
+import os
+import re
+import csv
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from audio_tools import AUDIO_STATS
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+OUTPUT_FOLDER = "output_audio"
+JOURNAL_FILE = os.path.join(OUTPUT_FOLDER, "journal.sqlite")
+METADATA_FILE = os.path.join(OUTPUT_FOLDER, "metadata.csv")
+SPEAKER = "1"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Uncommitted state changes that trigger a commit.
+COMMIT_EVERY = 256
+# Workers sharing one journal commit sooner, since an open write
+# transaction blocks every other worker's claims.
+WORKER_COMMIT_EVERY = 16
+# Seconds a worker holds its claimed sentences before others may take them.
+LEASE_SECONDS = 600
+# Attempts after which a failed sentence is no longer handed out.
+MAX_JOB_ATTEMPTS = 3
+# Seconds to wait for the journal's write lock held by another process.
+BUSY_TIMEOUT_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    sentence_id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    duration REAL,
+    leading_silence REAL,
+    trailing_silence REAL,
+    rms REAL,
+    peak REAL,
+    seconds_per_character REAL,
+    error TEXT,
+    updated REAL,
+    owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_hash ON jobs (hash);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+def sentence_hash(text):
+    """
+    Identity of a sentence in the journal: the hash of its stripped text.
+    """
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()[:32]
+
+def wav_name(sentence_id):
+    return f"sentence{sentence_id}.wav"
+
+# --------------------------------------------------------------------
+# 2. Journal
+# --------------------------------------------------------------------
+
+class JobJournal:
+    """
+    Crash-safe record of every sentence sent for synthesis, in an SQLite
+    database in WAL mode. A sentence is identified by the hash of its text
+    and keeps the same id, and so the same sentence{id}.wav, across runs.
+    (Rows imported from an old metadata.csv may share a hash; every one of
+    them is kept so that the exported metadata loses nothing.)
+    Its state moves from pending to done (once the wav is on disk) or failed,
+    with the attempt count, the audio statistics and the last error. Changes are committed in
+    batches; after a crash at most the last uncommitted batch is redone.
+    Safe to use from several threads.
+
+    Several worker processes can share one journal as a work queue: each
+    claims a batch of sentences, which become leased to it until
+    lease_expires. A worker that dies simply stops renewing its lease, and
+    the sentences go to the next worker to claim after the lease expires.
+    Results are recorded by sentence id and a done sentence stays done, so
+    a late or repeated result is harmless.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, commit_every=COMMIT_EVERY):
+        self.db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(jobs)")}
+        # Journals written before leases and audio statistics existed.
+        added = [("owner", "TEXT"), ("lease_expires", "REAL")] + [(name, "REAL") for name in AUDIO_STATS]
+        for column, kind in added:
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.commit_every = commit_every
+        self.uncommitted = 0
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def changed(self, count=1):
+        self.uncommitted += count
+        if self.uncommitted >= self.commit_every:
+            self.db.commit()
+            self.uncommitted = 0
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def import_metadata(self, metadata_file=METADATA_FILE):
+        """
+        Record the rows of an existing metadata.csv as done, so a journal
+        started on an old output folder does not pay for them again.
+        """
+        rows = []
+        with open(metadata_file, "r", encoding="utf-8", newline="") as infile:
+            for row in csv.DictReader(infile):
+                match = re.fullmatch(r"sentence(\d+)\.wav", row.get("path") or "")
+                if match and row.get("sentence"):
+                    stats = tuple(float(row[name]) if row.get(name) else None for name in AUDIO_STATS)
+                    rows.append((sentence_hash(row["sentence"]), int(match.group(1)), row["sentence"].strip(),
+                                 row["path"], DONE, 1, time.time()) + stats)
+        with self.lock:
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO jobs (hash, sentence_id, text, path, state, attempts, updated, "
+                f"{', '.join(AUDIO_STATS)}) VALUES ({', '.join('?' * (7 + len(AUDIO_STATS)))})", rows,
+            )
+            self.db.commit()
+        return len(rows)
+
+    def assign(self, sentences, first_free_id=1):
+        """
+        Register sentences given as (sentence_id or None, text) pairs and
+        return the (sentence_id, text) pairs still to synthesize, each text
+        once however often it repeats. A sentence already in the journal
+        keeps its id and is dropped if done. A new sentence without an id
+        gets the next id after every id in use and first_free_id - 1. A new
+        sentence with an id (from a shard) keeps it; if the journal already
+        uses that id for another text, nothing is assigned and ValueError
+        is raised, as renumbering it here would collide with other machines.
+        """
+        with self.lock:
+            known = {}
+            used = set()
+            for key, sentence_id, state in self.db.execute(
+                "SELECT hash, sentence_id, state FROM jobs ORDER BY state != ?, sentence_id", (DONE,)
+            ):
+                known.setdefault(key, (sentence_id, state))
+                used.add(sentence_id)
+            taken = [(sentence_id, text) for sentence_id, text in sentences
+                     if sentence_id is not None and sentence_id in used and sentence_hash(text) not in known]
+            if taken:
+                sentence_id, text = taken[0]
+                raise ValueError(f"{len(taken)} sentences come with ids the journal already uses for other texts, "
+                                 f"e.g. {sentence_id} for \"{text}\"; re-shard past the existing corpus.")
+            next_id = max(max(used, default=0) + 1, first_free_id)
+            jobs, new_rows = [], []
+            queued = set()
+            for sentence_id, text in sentences:
+                key = sentence_hash(text)
+                if key in queued:
+                    continue
+                queued.add(key)
+                if key in known:
+                    sentence_id, state = known[key]
+                    if state != DONE:
+                        jobs.append((sentence_id, text))
+                    continue
+                if sentence_id is None:
+                    sentence_id = next_id
+                elif sentence_id in used:
+                    # Two new texts of the same input share an id.
+                    raise ValueError(f"Sentence id {sentence_id} is given to more than one text.")
+                used.add(sentence_id)
+                next_id = max(next_id, sentence_id + 1)
+                known[key] = (sentence_id, PENDING)
+                new_rows.append((key, sentence_id, text.strip(), wav_name(sentence_id), PENDING, time.time()))
+                jobs.append((sentence_id, text))
+            self.db.executemany(
+                "INSERT INTO jobs (hash, sentence_id, text, path, state, updated) VALUES (?, ?, ?, ?, ?, ?)", new_rows
+            )
+            self.db.commit()
+        return jobs
+
+    def mark_done(self, sentence_id, stats=None, owner=None):
+        """
+        Record a sentence as done, with the audio statistics of its wav
+        (audio_tools.audio_stats) when known. A leased sentence is only
+        updated by the owner of its lease, so a worker whose lease expired
+        cannot overwrite the state of the worker that took it over.
+        """
+        values = [(stats or {}).get(name) for name in AUDIO_STATS]
+        with self.lock:
+            self.db.execute(
+                f"UPDATE jobs SET state = ?, attempts = attempts + 1, error = NULL, updated = ?, "
+                f"{', '.join(name + ' = ?' for name in AUDIO_STATS)} "
+                f"WHERE sentence_id = ? AND state != ? AND (state != ? OR owner = ?)",
+                [DONE, time.time()] + values + [sentence_id, DONE, LEASED, owner],
+            )
+            self.changed()
+
+    def mark_failed(self, sentence_id, error, owner=None):
+        """
+        Record a failed attempt; like mark_done, a leased sentence is only
+        updated by the owner of its lease.
+        """
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, error = ?, updated = ? "
+                "WHERE sentence_id = ? AND state != ? AND (state != ? OR owner = ?)",
+                (FAILED, str(error), time.time(), sentence_id, DONE, LEASED, owner),
+            )
+            self.changed()
+
+    def claim(self, owner, count, lease_seconds=LEASE_SECONDS, max_attempts=MAX_JOB_ATTEMPTS):
+        """
+        Lease up to count sentences to owner and return their (sentence_id,
+        text) pairs: pending sentences, failed ones with attempts left, and
+        leased ones whose lease has expired. The claim is a single write
+        transaction, so no sentence is ever leased to two live workers.
+        """
+        now = time.time()
+        with self.lock:
+            self.db.commit()
+            self.uncommitted = 0
+            self.db.execute("BEGIN IMMEDIATE")
+            rows = self.db.execute(
+                "SELECT sentence_id, text FROM jobs WHERE state = ? OR (state = ? AND attempts < ?) "
+                "OR (state = ? AND lease_expires < ?) ORDER BY sentence_id LIMIT ?",
+                (PENDING, FAILED, max_attempts, LEASED, now, count),
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE jobs SET state = ?, owner = ?, lease_expires = ?, updated = ? WHERE sentence_id = ?",
+                [(LEASED, owner, now + lease_seconds, now, sentence_id) for sentence_id, _ in rows],
+            )
+            self.db.commit()
+        return rows
+
+    def renew(self, owner, lease_seconds=LEASE_SECONDS):
+        """
+        Extend every lease owner still holds.
+        """
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE owner = ? AND state = ?",
+                (time.time() + lease_seconds, owner, LEASED),
+            )
+            self.db.commit()
+            self.uncommitted = 0
+
+    def release(self, owner):
+        """
+        Hand the sentences owner still holds back to the queue.
+        """
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET state = ?, lease_expires = NULL WHERE owner = ? AND state = ?",
+                (PENDING, owner, LEASED),
+            )
+            self.db.commit()
+            self.uncommitted = 0
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+    def export_metadata(self, metadata_file=METADATA_FILE):
+        """
+        Rewrite metadata_file from the done rows, in sentence id order, via a
+        temporary file so that a crash never leaves it half written. The
+        audio statistics follow the path, sentence and speaker columns, left
+        empty where unknown.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT path, text, {', '.join(AUDIO_STATS)} FROM jobs WHERE state = ? ORDER BY sentence_id", (DONE,)
+            ).fetchall()
+        tmp_file = metadata_file + ".tmp"
+        with open(tmp_file, "w", newline="", encoding="utf-8") as csvfile:
+            csv_writer = csv.writer(csvfile, delimiter=",")
+            csv_writer.writerow(["path", "sentence", "speaker"] + list(AUDIO_STATS))
+            for path, text, *stats in rows:
+                csv_writer.writerow([path, text, SPEAKER] + ["" if v is None else f"{v:.4f}" for v in stats])
+        os.replace(tmp_file, metadata_file)
+        return len(rows)
+
+def open_journal(path=JOURNAL_FILE, metadata_file=METADATA_FILE, commit_every=COMMIT_EVERY):
+    """
+    Open the journal, seeding a new one from an existing metadata.csv.
+    """
+    journal = JobJournal(path, commit_every)
+    if len(journal) == 0 and os.path.exists(metadata_file):
+        print(f"Imported {journal.import_metadata(metadata_file)} finished sentences from {metadata_file}.")
+    return journal
+
+# --------------------------------------------------------------------
+# 3. Main execution
+# --------------------------------------------------------------------
+
+def read_sentences(path):
+    """
+    (sentence_id or None, text) pairs from a shard file or a plain text
+    file with one sentence per line.
+    """
+    if path.endswith(".tsv"):
+        from shard_sentences import read_shard
+
+        return read_shard(path)
+    with open(path, "r", encoding="utf-8") as infile:
+        return [(None, line.strip()) for line in infile if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect the synthesis journal, fill it as a work queue, or export metadata.csv from it."
+    )
+    parser.add_argument("--journal", type=str, default=JOURNAL_FILE, help="Journal database.")
+    parser.add_argument("--enqueue", type=str, default=None,
+                        help="Add the sentences of this file (or shard .tsv) for generate_data.py --worker.")
+    parser.add_argument("--export", type=str, default=None, help="Write the finished sentences to this metadata.csv.")
+    args = parser.parse_args()
+
+    journal = open_journal(args.journal) if args.enqueue else JobJournal(args.journal)
+    if args.enqueue:
+        print(f"Queued {len(journal.assign(read_sentences(args.enqueue)))} sentences from {args.enqueue}.")
+    for state, count in sorted(journal.counts().items()):
+        print(f"{state:>8}: {count}")
+    if args.export:
+        print(f"Exported {journal.export_metadata(args.export)} rows to {args.export}.")
+        folder = os.path.dirname(args.export)
+        with open(args.export, "r", encoding="utf-8", newline="") as infile:
+            missing = [row["path"] for row in csv.DictReader(infile)
+                       if not os.path.exists(os.path.join(folder, row["path"]))]
+        if missing:
+            print(f"Warning: {len(missing)} exported wav files are missing from {folder or '.'}, e.g. {missing[0]}.")
+    journal.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import csv
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+METADATA_FILE = os.path.join("output_audio", "metadata.csv")
+# Bump when the layout of the index changes, so old indexes are rebuilt.
+INDEX_VERSION = 1
+# Arrays of an index, each stored as <name>.npy in the index folder.
+ARRAYS = ("text_blob", "text_offsets", "path_blob", "path_offsets", "speaker_ids", "durations", "text_lengths")
+
+def index_dir(metadata_file):
+    """
+    The index of a metadata file lives next to it, e.g. metadata.csv.index/.
+    """
+    return metadata_file + ".index"
+
+def replace_dir(tmp_dir, directory):
+    """
+    Move the finished folder tmp_dir to directory. An existing folder is
+    renamed aside first and deleted only once the new one is in place, so
+    it is never deleted before its replacement exists; a reader that finds
+    no folder in between rebuilds or retries, as it would for a missing one.
+    If another process put its own folder in place meanwhile, that one is
+    kept and tmp_dir is dropped.
+    """
+    old_dir = f"{directory}.old{os.getpid()}"
+    try:
+        os.replace(directory, old_dir)
+    except FileNotFoundError:
+        old_dir = None
+    try:
+        os.replace(tmp_dir, directory)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+def csv_signature(metadata_file):
+    stat = os.stat(metadata_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": INDEX_VERSION}
+
+# --------------------------------------------------------------------
+# 2. Building
+# --------------------------------------------------------------------
+
+def pack_strings(strings):
+    """
+    Concatenate strings into one UTF-8 byte array and return it with the
+    len(strings) + 1 offsets that delimit each string.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def build_index(metadata_file, directory=None):
+    """
+    Compile metadata_file into a columnar index: the sentences and the wav
+    paths as UTF-8 blobs with offsets, speaker ids into a speaker table,
+    durations (NaN where unknown) and sentence lengths in characters. The
+    CSV is read with a real CSV parser, so sentences may contain commas and
+    quotes. The index is written to a temporary folder and moved into place,
+    so that a reader never sees half of it.
+    """
+    directory = directory or index_dir(metadata_file)
+    signature = csv_signature(metadata_file)
+    texts, paths, speakers, durations = [], [], [], []
+    speaker_table = {}
+    with open(metadata_file, "r", encoding="utf-8", newline="") as infile:
+        for row in csv.DictReader(infile):
+            if not row.get("path") or row.get("sentence") is None:
+                continue
+            texts.append(row["sentence"])
+            paths.append(row["path"])
+            speakers.append(speaker_table.setdefault(row.get("speaker") or "", len(speaker_table)))
+            durations.append(float(row["duration"]) if row.get("duration") else np.nan)
+
+    text_blob, text_offsets = pack_strings(texts)
+    path_blob, path_offsets = pack_strings(paths)
+    arrays = {
+        "text_blob": text_blob,
+        "text_offsets": text_offsets,
+        "path_blob": path_blob,
+        "path_offsets": path_offsets,
+        "speaker_ids": np.array(speakers, dtype=np.int32),
+        "durations": np.array(durations, dtype=np.float32),
+        "text_lengths": np.array([len(t) for t in texts], dtype=np.int32),
+    }
+
+    tmp_dir = f"{directory}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), array)
+    with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as outfile:
+        json.dump({"csv": signature, "rows": len(texts), "speakers": list(speaker_table)}, outfile)
+    replace_dir(tmp_dir, directory)
+    return len(texts)
+
+# --------------------------------------------------------------------
+# 3. Loading
+# --------------------------------------------------------------------
+
+class MetadataIndex:
+    """
+    Read-only view of a compiled metadata index. The arrays are memory
+    mapped, so opening an index costs no more than reading its small JSON
+    header, and rows are decoded only when they are asked for.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as infile:
+            header = json.load(infile)
+        self.signature = header["csv"]
+        self.speakers = header["speakers"]
+        for name in ARRAYS:
+            path = os.path.join(directory, name + ".npy")
+            try:
+                setattr(self, name, np.load(path, mmap_mode="r"))
+            except ValueError:
+                # An empty array cannot be memory mapped.
+                setattr(self, name, np.load(path))
+
+    def __len__(self):
+        return len(self.speaker_ids)
+
+    def text(self, i):
+        return bytes(self.text_blob[self.text_offsets[i]:self.text_offsets[i + 1]]).decode("utf-8")
+
+    def path(self, i):
+        return bytes(self.path_blob[self.path_offsets[i]:self.path_offsets[i + 1]]).decode("utf-8")
+
+    def speaker(self, i):
+        return self.speakers[self.speaker_ids[i]]
+
+    def rows(self):
+        """
+        (path, sentence, speaker) for every row, in file order, each decoded
+        from the mapped blobs as it is reached.
+        """
+        texts = memoryview(self.text_blob)
+        paths = memoryview(self.path_blob)
+        text_offsets = self.text_offsets.tolist()
+        path_offsets = self.path_offsets.tolist()
+        for i in range(len(self)):
+            yield (str(paths[path_offsets[i]:path_offsets[i + 1]], "utf-8"),
+                   str(texts[text_offsets[i]:text_offsets[i + 1]], "utf-8"),
+                   self.speakers[self.speaker_ids[i]])
+
+def load_index(metadata_file=METADATA_FILE):
+    """
+    Open the index of metadata_file, building it first when it is missing
+    or the CSV changed (size or modification time) since it was built.
+    """
+    directory = index_dir(metadata_file)
+    try:
+        index = MetadataIndex(directory)
+        if index.signature == csv_signature(metadata_file):
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    build_index(metadata_file, directory)
+    return MetadataIndex(directory)
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile metadata.csv into a memory-mapped columnar index.")
+    parser.add_argument("--metadata", type=str, default=METADATA_FILE, help="metadata.csv to index.")
+    parser.add_argument("--force", action="store_true", help="Rebuild the index even if it is up to date.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.force:
+        build_index(args.metadata)
+    index = load_index(args.metadata)
+    print(f"Indexed {len(index)} rows of {args.metadata} in {time.perf_counter() - start:.3f} s "
+          f"({len(index.speakers)} speakers, {index.text_blob.nbytes / 1e6:.1f} MB of text).")
+
+    start = time.perf_counter()
+    index = load_index(args.metadata)
+    print(f"Opened the index in {(time.perf_counter() - start) * 1000:.2f} ms.")
+    known = np.isfinite(index.durations)
+    if known.any():
+        print(f"{np.sum(index.durations[known]) / 3600:.2f} hours of audio in {known.sum()} rows with a duration.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+OUTPUT_FILE = os.path.join("processed_texts", "generated_numeric_sentences.txt")
+
+# Each category has sentence templates ("{}" marks a slot) and one value
+# sampler per slot, shared by all of its templates:
+#   ["int", low, high]      uniform integer in [low, high]
+#   ["decimal", low, high]  uniform number in [low, high] rounded to 2 places
+#   ["choice", [...]]       uniform pick from a list of words
+#   ["choice_digits", [...]] random pattern with every "#" replaced by a digit
+#   ["fraction", max]       "a/b" with 1 <= a < b <= max
+CATEGORIES = {
+    "whole_numbers": {
+        "templates": [
+            "{} километра в час.", "{} метра в секунда.", "{} метра.", "{} мили.", "{} сантиметра.",
+            "{} инча.", "{} милиметра.", "{} хектопаскала.", "{} милиона.", "{} милиарда.",
+        ],
+        "slots": [["int", 1, 10000]],
+    },
+    "decimals": {
+        "templates": ["Температурата е минус {} градуса.", "Температурата е {} градуса."],
+        "slots": [["decimal", 0, 50]],
+    },
+    "large_numbers": {
+        "templates": [
+            "Населението е {} души.", "Бюджетът за проекта е {} лева.",
+            "Сметката за тока достигна {} лева.", "Инвестицията от {} лева бе одобрена.",
+        ],
+        "slots": [["int", 100000, 99999999]],
+    },
+    "ordinals": {
+        "templates": ["Днес е {}-ви август.", "{}-рият опит беше успешен."],
+        "slots": [["int", 1, 100]],
+    },
+    "years": {
+        "templates": ["През {} се случиха важни събития."],
+        "slots": [["int", 1900, 2100]],
+    },
+    "dates": {
+        "templates": ["Датата е {} {}."],
+        "slots": [
+            ["int", 1, 31],
+            ["choice", ["януари", "февруари", "март", "април", "май", "юни", "юли", "август",
+                        "септември", "октомври", "ноември", "декември"]],
+        ],
+    },
+    "money": {
+        "templates": [
+            "Цената на продукта е {} лева.", "Себестойността на стоката е {} лeвa.",
+            "Стойността на артикула е {} евро.", "Данъчната оценка на имота е {} евро.",
+            "Буртният вътрешен продукт, възлиза на {} лева.",
+        ],
+        "slots": [["decimal", 1, 500000]],
+    },
+    "phone_numbers": {
+        "templates": ["Моят телефонен номер е {}."],
+        "slots": [["choice_digits", [
+            "+359 88# ### ###", "08## ### ###", "02 ### ####", "08## ## ## ##",
+            "+359 52 ######", "08# ### ## ##",
+        ]]],
+    },
+    "fractions": {
+        "templates": ["Рецептата изисква {} чаша захар.", "Отговорът на задачата е {}.",
+                      "Изядохме {} от тортата."],
+        "slots": [["fraction", 12]],
+    },
+    "measures": {
+        "templates": ["Теглото на пакета е {} килограма.", "Обемът на кутията е {} литра.",
+                      "Номерът на стаята е {}."],
+        "slots": [["int", 1, 100]],
+    },
+}
+
+# Sentences per category; roughly the mix of the original hand-written generator.
+QUOTAS = {
+    "whole_numbers": 1000,
+    "decimals": 50,
+    "large_numbers": 13,
+    "ordinals": 69,
+    "years": 16,
+    "dates": 100,
+    "money": 500,
+    "phone_numbers": 7,
+    "fractions": 3,
+    "measures": 102,
+}
+
+SEED = 0
+# Sentences sampled per vectorized batch.
+BATCH_SIZE = 200_000
+# A category stops early after this many batches without a single new sentence.
+MAX_STALE_BATCHES = 3
+
+# --------------------------------------------------------------------
+# 2. Vectorized sampling
+# --------------------------------------------------------------------
+
+def fill_digits(rng, patterns, n):
+    """
+    Return n strings, each a randomly chosen pattern with every "#" replaced
+    by a random digit. Works on a (n, width) array of single characters.
+    """
+    width = max(len(p) for p in patterns)
+    chosen = rng.integers(0, len(patterns), n)
+    result = np.empty(n, dtype=f"<U{width}")
+    for index, pattern in enumerate(patterns):
+        rows = np.flatnonzero(chosen == index)
+        chars = np.tile(np.array(list(pattern), dtype="<U1"), (len(rows), 1))
+        holes = [i for i, c in enumerate(pattern) if c == "#"]
+        chars[:, holes] = rng.integers(0, 10, (len(rows), len(holes))).astype("<U1")
+        result[rows] = chars.view(f"<U{len(pattern)}").ravel()
+    return result
+
+def sample_slot(rng, slot, n):
+    """
+    Draw n string values for one template slot.
+    """
+    kind = slot[0]
+    if kind == "int":
+        return rng.integers(slot[1], slot[2] + 1, n).astype(str)
+    if kind == "decimal":
+        return np.round(rng.uniform(slot[1], slot[2], n), 2).astype(str)
+    if kind == "choice":
+        return np.asarray(slot[1])[rng.integers(0, len(slot[1]), n)]
+    if kind == "choice_digits":
+        return fill_digits(rng, slot[1], n)
+    if kind == "fraction":
+        denominators = rng.integers(2, slot[1] + 1, n)
+        numerators = (rng.random(n) * (denominators - 1)).astype(np.int64) + 1
+        return np.char.add(np.char.add(numerators.astype(str), "/"), denominators.astype(str))
+    raise ValueError(f"Unknown slot type: {kind}")
+
+def sample_sentences(rng, category, n):
+    """
+    Return n sentences of one category: a random template per sentence,
+    filled with independently sampled slot values.
+    """
+    templates = category["templates"]
+    values = [sample_slot(rng, slot, n) for slot in category["slots"]]
+    chosen = rng.integers(0, len(templates), n)
+    sentences = np.empty(n, dtype=object)
+    for index, template in enumerate(templates):
+        rows = np.flatnonzero(chosen == index)
+        parts = template.split("{}")
+        text = np.full(len(rows), parts[0])
+        for slot_values, part in zip(values, parts[1:]):
+            text = np.char.add(np.char.add(text, slot_values[rows]), part)
+        sentences[rows] = text
+    return sentences
+
+# --------------------------------------------------------------------
+# 3. Generation
+# --------------------------------------------------------------------
+
+def fill_category(rng, seen, name, category, quota, batch_size):
+    """
+    Yield up to quota new sentences of one category, adding them to seen.
+    Stops early after MAX_STALE_BATCHES batches without a new sentence and
+    returns the number of sentences yielded.
+    """
+    produced = 0
+    stale = 0
+    while produced < quota and stale < MAX_STALE_BATCHES:
+        n = min(batch_size, int((quota - produced) * 1.2) + 16)
+        batch = []
+        for sentence in sample_sentences(rng, category, n):
+            if sentence not in seen:
+                seen.add(sentence)
+                batch.append(sentence)
+                if produced + len(batch) == quota:
+                    break
+        stale = 0 if batch else stale + 1
+        produced += len(batch)
+        yield from batch
+    if produced < quota:
+        print(f"Category '{name}' only has {produced} distinct sentences (quota {quota}).")
+    return produced
+
+def iter_numeric_sentences(quotas=QUOTAS, categories=CATEGORIES, seed=SEED, batch_size=BATCH_SIZE):
+    """
+    Yield unique numeric sentences, category by category, until every quota
+    is met. Values are sampled in bulk with NumPy and deduplicated against
+    everything yielded so far. The unmet quota of categories whose templates
+    run out of distinct sentences is shared among the categories that still
+    have room, in proportion to their quotas, until the total is met or
+    every category is exhausted.
+    """
+    rng = np.random.default_rng(seed)
+    seen = set()
+    exhausted = set()
+    pending = quotas
+    while True:
+        shortfall = 0
+        for name, quota in pending.items():
+            produced = yield from fill_category(rng, seen, name, categories[name], quota, batch_size)
+            if produced < quota:
+                exhausted.add(name)
+                shortfall += quota - produced
+        remaining = {name: quota for name, quota in quotas.items() if name not in exhausted and quota}
+        if not shortfall or not remaining:
+            break
+        print(f"Sharing the {shortfall} missing sentences among {', '.join(remaining)}.")
+        pending = scale_quotas(remaining, shortfall)
+
+def load_config(path):
+    """
+    Load a JSON config with optional "seed", "quotas" and "categories" keys;
+    categories given there replace or extend the built-in ones.
+    """
+    with open(path, "r", encoding="utf-8") as infile:
+        config = json.load(infile)
+    categories = dict(CATEGORIES)
+    categories.update(config.get("categories", {}))
+    return config.get("quotas", QUOTAS), categories, config.get("seed", SEED)
+
+def scale_quotas(quotas, total):
+    """
+    Scale quotas proportionally so that they add up to total.
+    """
+    current = sum(quotas.values())
+    scaled = {name: int(quota * total / current) for name, quota in quotas.items()}
+    largest = max(scaled, key=scaled.get)
+    scaled[largest] += total - sum(scaled.values())
+    return scaled
+
+def generate_numeric_file(output_file=OUTPUT_FILE, quotas=QUOTAS, categories=CATEGORIES, seed=SEED):
+    """
+    Stream generated numeric sentences to output_file, one per line.
+    Returns the number of sentences written, which is less than the sum of
+    the quotas only when every category ran out of distinct sentences.
+    """
+    count = 0
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        for sentence in iter_numeric_sentences(quotas, categories, seed):
+            if count:
+                outfile.write("\n")
+            outfile.write(sentence)
+            count += 1
+    print(f"Generated {count} numeric sentences and saved them to {output_file}.")
+    if count < sum(quotas.values()):
+        print(f"Only {count} of the {sum(quotas.values())} requested sentences exist; widen the templates or slots.")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate unique Bulgarian sentences containing numbers.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="Where to write the sentences.")
+    parser.add_argument("--config", type=str, default=None, help="JSON file with seed, quotas and categories.")
+    parser.add_argument("--count", type=int, default=None, help="Scale the quotas to this many sentences in total.")
+    parser.add_argument("--seed", type=int, default=None, help="Override the seed.")
+    args = parser.parse_args()
+
+    quotas, categories, seed = load_config(args.config) if args.config else (QUOTAS, CATEGORIES, SEED)
+    if args.count:
+        quotas = scale_quotas(quotas, args.count)
+    if args.seed is not None:
+        seed = args.seed
+    count = generate_numeric_file(args.output, quotas, categories, seed)
+    sys.exit(0 if count == sum(quotas.values()) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import os
 import re
+import json
 import random
+import hashlib
+import argparse
+import tempfile
 import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dedup import NEAR_DUPLICATE_THRESHOLD, SentenceDeduplicator, iter_deduplicated
+from numeric_sentences import CATEGORIES, QUOTAS, SEED, generate_numeric_file, iter_numeric_sentences, load_config
 
 # --------------------------------------------------------------------
 # 1. Setup and constants
@@ -9,6 +17,7 @@ import unicodedata
 
 EXTRACTED_DIR = "extracted_texts"
 PROCESSED_DIR = "processed_texts"
+COMBINED_FILE = os.path.join("data", "sentences.txt")
 
 # Regex to remove specific abbreviations or references:
 REMOVE_REFERENCES = r"(р\.|Б\.|т\.н\.|т\.e\.|Б\.а\.|Бел\.пр\.)"
@@ -17,6 +26,23 @@ REMOVE_REFERENCES = r"(р\.|Б\.|т\.н\.|т\.e\.|Б\.а\.|Бел\.пр\.)"
 MAX_SENTENCE_CHARACTERS = 150
 MIN_SENTENCE_CHARACTERS = 10
 
+# Books are read and cleaned in chunks of about this many characters, which
+# also lets a process pool clean one large book on several cores.
+CHUNK_CHARACTERS = 1_000_000
+# A chunk is forced out when no sentence break shows up within this many blocks.
+MAX_CHUNK_BLOCKS = 8
+
+# Average seconds of synthesized audio per character (24.80 hours over 1.08
+# million characters), used to estimate the audio cost of sentences.
+SECONDS_PER_CHARACTER = 0.083
+
+# The combined corpus is shuffled on disk in runs of this many lines.
+SHUFFLE_RUN_LINES = 1_000_000
+SHUFFLE_SEED = 0
+
+# Manifest of already cleaned books, used to skip unchanged inputs.
+MANIFEST_FILE = os.path.join(PROCESSED_DIR, ".manifest.json")
+
 # Ensure the processed directory exists.
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
@@ -24,16 +50,63 @@ os.makedirs(PROCESSED_DIR, exist_ok=True)
 # 2. Text processing
 # --------------------------------------------------------------------
 
-def process_text(text):
+# Precompiled normalizer used by split_sentences. The initials pattern carries
+# a lookahead on its first two characters so the scanner can skip ahead quickly.
+REFERENCES_PATTERN = re.compile(REMOVE_REFERENCES)
+THAT_IS_PATTERN = re.compile(r"т\. ?е\.")
+INITIALS_PATTERN = re.compile(r"(?=[А-Я]\.)\b(?:[А-Я]\.\s*){2,}")
+DISALLOWED_CHARACTERS = re.compile(r"[^\u0400-\u04FF\s.,!?\-0-9]+")
+# A sentence is everything up to and including the next . ! or ?, plus the
+# unterminated tail (an empty text still yields one empty piece, as re.split does).
+SENTENCE_PATTERN = re.compile(r"[^.!?]*[.!?]|[^.!?]+$|^$")
+
+def normalize_text(text):
     """
-    Process a raw text string:
-    1) Normalize Unicode.
-    2) Remove specific abbreviations.
-    3) Clean extraneous whitespace.
-    4) Filter out non-Cyrillic characters (keep punctuation, digits).
-    5) Adjust spacing around punctuation.
-    6) Split into sentences, discard too long or too short.
-    7) Merge short lines or words.
+    Normalize a raw text string (steps 1-4 of process_text): NFC, removal of
+    references, abbreviations and initials, whitespace collapse and the
+    character whitelist.
+    """
+    text = unicodedata.normalize('NFC', text)
+
+    # Removal passes stay sequential: one removal can expose another match.
+    text = REFERENCES_PATTERN.sub("", text)
+    text = THAT_IS_PATTERN.sub("", text)
+    text = INITIALS_PATTERN.sub("", text)
+
+    # Collapse whitespace, then drop characters outside the whitelist. Trailing
+    # whitespace is kept as one space since it ends the last sentence.
+    collapsed = " ".join(text.split())
+    if text[-1:].isspace():
+        collapsed += " "
+    return DISALLOWED_CHARACTERS.sub("", collapsed)
+
+def split_normalized(text):
+    """
+    Split normalized text into sentences and keep those within the length
+    limits (steps 5-6 of process_text).
+    """
+    # Every . ! or ? ends a sentence; the reference implementation inserts a
+    # space after it when missing and then splits on that whitespace.
+    processed_sentences = []
+    for sentence in SENTENCE_PATTERN.findall(text):
+        sentence = sentence.strip(" ").lstrip(", ")
+        if MIN_SENTENCE_CHARACTERS <= len(sentence) <= MAX_SENTENCE_CHARACTERS:
+            processed_sentences.append(sentence)
+
+    return processed_sentences
+
+def split_sentences(text):
+    """
+    Clean a raw text string and return the list of accepted sentences
+    (steps 1-6 of process_text, without the final merge of short lines).
+    Produces the same output as split_sentences_reference.
+    """
+    return split_normalized(normalize_text(text))
+
+def split_sentences_reference(text):
+    """
+    Original regex-chain implementation of split_sentences, kept as the
+    golden reference for utils/check_normalizer.py.
     """
     # Normalize Unicode for consistency.
     text = unicodedata.normalize('NFC', text)
@@ -64,34 +137,231 @@ def process_text(text):
 
         processed_sentences.append(sentence)
 
-    # Merge sentences with isolated short words (if any) on separate lines.
-    processed_text = "\n".join(processed_sentences)
-    processed_text = re.sub(r"\n([А-Яа-яA-Za-z0-9]{1,3})\n", r" \1\n", processed_text)
+    return processed_sentences
+
+# A line consisting of one short word, merged into the previous line.
+SHORT_LINE = re.compile(r"[А-Яа-яA-Za-z0-9]{1,3}")
+
+def iter_merged_lines(sentences):
+    """
+    Yield output lines from an iterable of sentences, merging isolated short
+    words (if any) into the previous line. Streaming equivalent of
+    re.sub(r"\n([А-Яа-яA-Za-z0-9]{1,3})\n", r" \1\n", "\n".join(sentences)):
+    the first and last sentence are never merged, and neither is a sentence
+    right after a merged one.
+    """
+    iterator = iter(sentences)
+    line = next(iterator, None)
+    if line is None:
+        return
+    current = next(iterator, None)
+    merged_previous = False
+    while current is not None:
+        following = next(iterator, None)
+        if following is not None and not merged_previous and SHORT_LINE.fullmatch(current):
+            line += " " + current
+            merged_previous = True
+        else:
+            yield line
+            line = current
+            merged_previous = False
+        current = following
+    yield line
+
+def merge_short_lines(sentences):
+    """
+    Join sentences into one string, one per line, and merge isolated short
+    words (if any) into the previous line.
+    """
+    return "\n".join(iter_merged_lines(sentences))
 
-    return processed_text
+def process_text(text):
+    """
+    Process a raw text string:
+    1) Normalize Unicode.
+    2) Remove specific abbreviations.
+    3) Clean extraneous whitespace.
+    4) Filter out non-Cyrillic characters (keep punctuation, digits).
+    5) Adjust spacing around punctuation.
+    6) Split into sentences, discard too long or too short.
+    7) Merge short lines or words.
+    """
+    return merge_short_lines(split_sentences(text))
 
 # --------------------------------------------------------------------
 # 3. Processing files
 # --------------------------------------------------------------------
 
-def process_all_files():
+# Tail of a chunk that must not be cut off from the following text: a removed
+# abbreviation or a single capital initial, which may continue after a newline.
+UNSAFE_CHUNK_TAIL = re.compile(r"(?:" + REMOVE_REFERENCES + r"|т\. ?е\.|[А-Я]\.)$")
+
+def find_chunk_cut(text, start=0):
+    """
+    Return the position right after the last safe cut in text[start:], or -1.
+    A cut is safe at a newline that directly follows sentence-ending
+    punctuation, so cleaning both sides separately yields the same sentences
+    as cleaning them together.
+    """
+    pos = len(text)
+    while True:
+        pos = text.rfind("\n", start, pos)
+        if pos <= 0:
+            return -1
+        if text[pos - 1] in ".!?" and not UNSAFE_CHUNK_TAIL.search(text, max(0, pos - 8), pos):
+            return pos + 1
+
+def iter_text_chunks(path, chunk_characters=CHUNK_CHARACTERS):
+    """
+    Read a raw text file in blocks of chunk_characters characters and yield
+    chunks that end at a safe cut; the unfinished tail is carried into the
+    next block. Memory stays bounded by a few blocks, unless a file goes
+    MAX_CHUNK_BLOCKS blocks without a single sentence break, in which case
+    the buffer is cut where it is.
+    """
+    tail = ""
+    with open(path, "r", encoding="utf-8") as infile:
+        while True:
+            block = infile.read(chunk_characters)
+            if not block:
+                break
+            text = tail + block
+            # The tail has no safe cut of its own, so only search the new part.
+            cut = find_chunk_cut(text, max(0, len(tail) - 1))
+            if cut == -1 and len(text) < MAX_CHUNK_BLOCKS * chunk_characters:
+                tail = text
+                continue
+            if cut == -1:
+                cut = len(text)
+            yield text[:cut]
+            tail = text[cut:]
+    if tail:
+        yield tail
+
+def iter_clean_sentences(path, chunk_characters=CHUNK_CHARACTERS):
+    """
+    Stream the cleaned sentences of a raw text file, chunk by chunk.
+    """
+    for chunk in iter_text_chunks(path, chunk_characters):
+        yield from split_sentences(chunk)
+
+def write_lines(output_path, lines):
+    """
+    Write lines separated by newlines (no trailing newline) to output_path,
+    replacing the file atomically once everything has been written.
+    """
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as outfile:
+        for i, line in enumerate(lines):
+            if i:
+                outfile.write("\n")
+            outfile.write(line)
+    os.replace(tmp_path, output_path)
+
+def config_hash():
+    """
+    Return a hash of the cleaning rules; a change invalidates every manifest entry.
+    """
+    config = [REMOVE_REFERENCES, MIN_SENTENCE_CHARACTERS, MAX_SENTENCE_CHARACTERS]
+    return hashlib.sha256(json.dumps(config, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def file_hash(path):
+    """
+    Return the SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as infile:
+        for block in iter(lambda: infile.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as infile:
+        return json.load(infile)
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as outfile:
+        json.dump(manifest, outfile, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def iter_parallel_sentences(executor, workers, paths):
+    """
+    For each path, yield an iterator over its cleaned sentences. Chunks of all
+    books are cleaned on the executor, with at most 2 * workers chunks in
+    flight so that memory stays bounded; each book's iterator must be
+    exhausted before the next one is requested.
+    """
+    chunks = ((i, chunk) for i, path in enumerate(paths) for chunk in iter_text_chunks(path))
+    in_flight = deque()
+
+    def fill():
+        while len(in_flight) < 2 * workers:
+            item = next(chunks, None)
+            if item is None:
+                return
+            in_flight.append((item[0], executor.submit(split_sentences, item[1])))
+
+    def book(index):
+        fill()
+        while in_flight and in_flight[0][0] == index:
+            yield from in_flight.popleft()[1].result()
+            fill()
+
+    for index in range(len(paths)):
+        yield book(index)
+
+def process_all_files(workers=1, force=False):
     """
     Processes all .txt files in EXTRACTED_DIR, cleans them and outputs
     the results into PROCESSED_DIR with a "_clean.txt" suffix.
+
+    Books are streamed chunk by chunk, so no book is ever loaded whole.
+    Books whose content and cleaning config match the manifest are skipped
+    unless force is set. With workers > 1, books (and chunks of large books)
+    are cleaned in parallel on a process pool.
     """
-    for filename in os.listdir(EXTRACTED_DIR):
+    manifest = {} if force else load_manifest()
+    current_config = config_hash()
+
+    pending = []
+    for filename in sorted(os.listdir(EXTRACTED_DIR)):
         if filename.endswith(".txt"):
             input_path = os.path.join(EXTRACTED_DIR, filename)
             output_path = os.path.join(PROCESSED_DIR, filename.replace(".txt", "_clean.txt"))
+            source_hash = file_hash(input_path)
+            entry = {"source_hash": source_hash, "config_hash": current_config}
+            if manifest.get(filename) == entry and os.path.exists(output_path):
+                print(f"Unchanged, skipping: {filename}")
+                continue
+            pending.append((filename, input_path, output_path, entry))
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        book_sentences = iter_parallel_sentences(executor, workers, [job[1] for job in pending])
+    else:
+        executor = None
+        book_sentences = (iter_clean_sentences(job[1]) for job in pending)
+    try:
+        for (filename, input_path, output_path, entry), sentences in zip(pending, book_sentences):
             print(f"Processing: {filename} -> {output_path}")
-
-            with open(input_path, "r", encoding="utf-8") as infile:
-                text = infile.read()
-
-            processed_text = process_text(text)
-
-            with open(output_path, "w", encoding="utf-8") as outfile:
-                outfile.write(processed_text)
+            write_lines(output_path, iter_merged_lines(sentences))
+
+            manifest[filename] = entry
+            save_manifest(manifest)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    # Forget books that were removed from EXTRACTED_DIR.
+    books = set(f for f in os.listdir(EXTRACTED_DIR) if f.endswith(".txt"))
+    stale = set(manifest) - books
+    if stale:
+        for filename in stale:
+            del manifest[filename]
+        save_manifest(manifest)
 
     print("Processing complete! Cleaned files saved in 'processed_texts' folder.")
 
@@ -99,96 +369,14 @@ def process_all_files():
 # 4. Synthetic data generation
 # --------------------------------------------------------------------
 
-def generate_numeric_sentences():
+def generate_numeric_sentences(quotas=QUOTAS, seed=SEED):
     """
-    Generates a variety of Bulgarian sentences containing numbers
-    (decimals, ordinals, large numbers, etc.) to expand numeric coverage.
+    Generates a variety of unique Bulgarian sentences containing numbers
+    (decimals, ordinals, large numbers, etc.) to expand numeric coverage,
+    using the template generator in numeric_sentences.py.
     Returns a list of strings.
     """
-    examples = []
-
-    # 1. Whole Numbers
-    unique_numbers = random.sample(range(1, 10001), 1000)
-    for i in range(100):
-        examples.append(f"{unique_numbers[i]} километра в час.")
-        examples.append(f"{unique_numbers[i+100]} метра в секунда.")
-        examples.append(f"{unique_numbers[i+200]} метра.")
-        examples.append(f"{unique_numbers[i+300]} мили.")
-        examples.append(f"{unique_numbers[i+400]} сантиметра.")
-        examples.append(f"{unique_numbers[i+500]} инча.")
-        examples.append(f"{unique_numbers[i+600]} милиметра.")
-        examples.append(f"{unique_numbers[i+700]} хектопаскала.")
-        examples.append(f"{unique_numbers[i+800]} милиона.")
-        examples.append(f"{unique_numbers[i+900]} милиарда.")
-
-    # 2. Decimals
-    for _ in range(25):
-        num = round(random.uniform(50, 0), 2)
-        examples.append(f"Температурата е минус {num} градуса.")
-        examples.append(f"Температурата е {num} градуса.")
-
-    # 3. Large Numbers
-    large_nums = [str(random.randint(100000, 9999999)) for _ in range(10)]
-    for num in large_nums:
-        examples.append(f"Населението е {num} души.")
-    examples.append("Бюджетът за проекта е 1000000 лева.")
-    examples.append("Сметката за тока достигна 500000 лева.")
-    examples.append("Инвестицията от 75000000 лева бе одобрена.")
-
-    # 4. Ordinal Numbers
-    for i in range(1, 51):
-        examples.append(f"Днес е {i}-ви август.")
-    for i in range(1, 20):
-        examples.append(f"{i}-рият опит беше успешен.")
-
-    # 5. Years & Dates
-    years = [1984, 1987, 1989, 1999, 2003, 2010, 2008, 2019, 2020, 2021, 2022, 2023, 2024, 2025, 2030, 2050]
-    for year in years:
-        examples.append(f"През {year} се случиха важни събития.")
-    
-    for _ in range(100):
-        day = random.randint(1, 31)
-        month = random.choice(["януари", "февруари", "март", "април", 
-                              "май", "юни", "юли", "август", 
-                              "септември", "октомври", "ноември", "декември"])
-        examples.append(f"Датата е {day} {month}.")
-
-    # 6. Money
-    for _ in range(100):
-        amount = round(random.uniform(1, 500000), 2)
-        examples.append(f"Цената на продукта е {amount} лева.")
-        examples.append(f"Себестойността на стоката е {amount} лeвa.")
-        examples.append(f"Стойността на артикула е {amount} евро.")
-        examples.append(f"Данъчната оценка на имота е {amount} евро.")
-        examples.append(f"Буртният вътрешен продукт, възлиза на {amount} лева.")
-
-    # 7. Phone Numbers (Various formats)
-    phone_formats = [
-        "+359 888 123 456",
-        "0888 765 432",
-        "02 987 6543",
-        "0897 12 34 56",
-        "+359 52 123456",
-        "087 765 43 21",
-        "0885 536 98 73"
-    ]
-    for phone in phone_formats:
-        examples.append(f"Моят телефонен номер е {phone}.")
-
-    # 9. Fractions
-    examples.append("Половината от ябълката е 1/2.")
-    examples.append("Три четвърти от населението са доволни, 3/4.")
-    examples.append("Рецептата изисква 2/3 чаша захар.")
-
-    # 10. Additional numeric contexts
-    examples.append("Номерът на стаята е 202.")
-    examples.append("Теглото на пакета е 7 килограма.")
-    for _ in range(50):
-        weight = round(random.uniform(1, 100))
-        examples.append(f"Теглото на пакета е {weight} килограма.")
-        examples.append(f"Обемът на кутията е {weight} литра.")
-
-    return examples
+    return list(iter_numeric_sentences(quotas, CATEGORIES, seed))
 
 def save_generated_sentences(sentences, filename="generated_numeric_sentences.txt"):
     """
@@ -219,65 +407,142 @@ def count_numbers(text):
 # 6. Combining processed data
 # --------------------------------------------------------------------
 
-def combine_processed_texts():
+def iter_source_sentences(processed_dir=PROCESSED_DIR):
     """
-    Combine all cleaned text files and generated numeric sentences into one file,
-    then randomly shuffle the sentences so numeric sentences are mixed with the rest.
+    Stream the sentences of all cleaned text files (in name order) followed by
+    the generated numeric sentences, one line at a time.
     """
-    combined_text = ""
+    paths = [
+        os.path.join(processed_dir, filename)
+        for filename in sorted(os.listdir(processed_dir))
+        if filename.endswith("_clean.txt")
+    ]
+    generated_numeric_path = os.path.join(processed_dir, "generated_numeric_sentences.txt")
+    if os.path.exists(generated_numeric_path):
+        paths.append(generated_numeric_path)
 
-    # 1) Gather all cleaned text
-    for filename in os.listdir(PROCESSED_DIR):
-        if filename.endswith("_clean.txt"):
-            file_path = os.path.join(PROCESSED_DIR, filename)
-            with open(file_path, "r", encoding="utf-8") as infile:
-                combined_text += infile.read() + "\n"
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as infile:
+            for line in infile:
+                line = line.strip()
+                if line:
+                    yield line
 
-    # 2) Add generated numeric sentences
-    generated_numeric_path = os.path.join(PROCESSED_DIR, "generated_numeric_sentences.txt")
-    if os.path.exists(generated_numeric_path):
-        with open(generated_numeric_path, "r", encoding="utf-8") as infile:
-            combined_text += infile.read() + "\n"
-
-    # 3) Split the text into a list of sentences, shuffle it, and then join back together.
-    sentences = combined_text.strip().split("\n")
-    random.shuffle(sentences)
-    shuffled_text = "\n".join(sentences)
-
-    # 4) Write the shuffled text to the combined file.
-    # combined_path = os.path.join(PROCESSED_DIR, "sentences.txt")
-    combined_path = os.path.join("data", "sentences.txt")
-    with open(combined_path, "w", encoding="utf-8") as outfile:
-        outfile.write(shuffled_text)
-
-    # 5) Calculate and print statistics from the shuffled text.
-    total_words = count_total_words(shuffled_text)
-    total_numbers = count_numbers(shuffled_text)
+def write_shuffled_runs(sentences, tmp_dir, rng, run_lines):
+    """
+    Split a stream of sentences into runs of at most run_lines lines, shuffle
+    each run in memory and write it to its own file in tmp_dir.
+    Returns a list of (path, line count).
+    """
+    runs = []
+
+    def flush(run):
+        rng.shuffle(run)
+        path = os.path.join(tmp_dir, f"run{len(runs)}.txt")
+        with open(path, "w", encoding="utf-8") as outfile:
+            outfile.writelines(line + "\n" for line in run)
+        runs.append((path, len(run)))
+
+    run = []
+    for sentence in sentences:
+        run.append(sentence)
+        if len(run) == run_lines:
+            flush(run)
+            run = []
+    if run:
+        flush(run)
+    return runs
+
+def iter_interleaved_runs(runs, rng):
+    """
+    Merge shuffled runs by repeatedly taking the next line of a run chosen
+    with probability proportional to its remaining lines. Together with the
+    in-run shuffle this yields a uniformly random permutation of all lines.
+    """
+    files = [open(path, "r", encoding="utf-8") for path, _ in runs]
+    remaining = [count for _, count in runs]
+    total = sum(remaining)
+    try:
+        while total:
+            pick = rng.randrange(total)
+            run = 0
+            while pick >= remaining[run]:
+                pick -= remaining[run]
+                run += 1
+            remaining[run] -= 1
+            total -= 1
+            yield files[run].readline().rstrip("\n")
+    finally:
+        for infile in files:
+            infile.close()
+
+def combine_processed_texts(dedup_threshold=NEAR_DUPLICATE_THRESHOLD, seed=SHUFFLE_SEED, run_lines=SHUFFLE_RUN_LINES,
+                            processed_dir=PROCESSED_DIR, combined_path=COMBINED_FILE):
+    """
+    Combine all cleaned text files and generated numeric sentences into one file,
+    drop exact and near duplicates (estimated Jaccard similarity of character
+    shingles >= dedup_threshold; None skips deduplication), then randomly
+    shuffle the sentences so numeric sentences are mixed with the rest.
+
+    The corpus is never held in memory: sentences are streamed through the
+    deduplicator into shuffled runs of run_lines lines on disk, and the runs
+    are interleaved into data/sentences.txt. The shuffle is reproducible for
+    a given seed. Word and number counts are taken while writing.
+    Returns (sentences, total_words, total_numbers).
+    """
+    rng = random.Random(seed)
+    counts = {"sentences": 0, "words": 0, "numbers": 0}
+
+    def counted(lines):
+        for line in lines:
+            counts["sentences"] += 1
+            counts["words"] += count_total_words(line)
+            counts["numbers"] += count_numbers(line)
+            yield line
+
+    with tempfile.TemporaryDirectory(prefix="shuffle_") as tmp_dir:
+        # 1) Stream every sentence through the deduplicator into shuffled runs.
+        sentences = iter_source_sentences(processed_dir)
+        if dedup_threshold is not None:
+            deduplicator = SentenceDeduplicator(threshold=dedup_threshold)
+            sentences = iter_deduplicated(sentences, deduplicator)
+        runs = write_shuffled_runs(sentences, tmp_dir, rng, run_lines)
+        if dedup_threshold is not None:
+            deduplicator.report(SECONDS_PER_CHARACTER)
+
+        # 2) Interleave the runs into the combined file, counting as we go.
+        write_lines(combined_path, counted(iter_interleaved_runs(runs, rng)))
+
+    # 3) Print statistics gathered while writing.
+    total_words = counts["words"]
+    total_numbers = counts["numbers"]
     percentage_numeric = (total_numbers / total_words) * 100 if total_words else 0
+    print(f"Wrote {counts['sentences']} sentences to {combined_path}.")
     print(f"Numbers make up {percentage_numeric:.2f}% of the full dataset.")
+    return counts["sentences"], total_words, total_numbers
 
 # --------------------------------------------------------------------
 # 7. Main execution
 # --------------------------------------------------------------------
 
 def main():
+    parser = argparse.ArgumentParser(description="Clean extracted texts and build data/sentences.txt.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used for cleaning.")
+    parser.add_argument("--force", action="store_true", help="Re-clean every book, ignoring the manifest.")
+    parser.add_argument("--dedup-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Similarity above which two sentences count as near duplicates.")
+    parser.add_argument("--seed", type=int, default=SHUFFLE_SEED, help="Seed of the corpus shuffle.")
+    parser.add_argument("--numeric-config", type=str, default=None,
+                        help="JSON config (seed, quotas, categories) for the numeric sentence generator.")
+    args = parser.parse_args()
+
     # 1) Process all files in EXTRACTED_DIR -> PROCESSED_DIR
-    process_all_files()
-    # 2) Generate synthetic numeric data and save to file
-    numeric_sentences = generate_numeric_sentences()
-    save_generated_sentences(numeric_sentences)
-    # 3) Calculate how many numbers vs total words in all cleaned files
-    total_words = 0
-    total_numbers = 0
-    for filename in os.listdir(PROCESSED_DIR):
-        if filename.endswith("_clean.txt"):
-            file_path = os.path.join(PROCESSED_DIR, filename)
-            with open(file_path, "r", encoding="utf-8") as infile:
-                text = infile.read()
-                total_words += count_total_words(text)
-                total_numbers += count_numbers(text)
-
-    combine_processed_texts()
+    process_all_files(workers=args.workers, force=args.force)
+    # 2) Generate synthetic numeric data and stream it to file
+    quotas, categories, seed = load_config(args.numeric_config) if args.numeric_config else (QUOTAS, CATEGORIES, SEED)
+    generate_numeric_file(os.path.join(PROCESSED_DIR, "generated_numeric_sentences.txt"), quotas, categories, seed)
+    # 3) Deduplicate, shuffle and combine everything into data/sentences.txt
+    combine_processed_texts(dedup_threshold=args.dedup_threshold, seed=args.seed)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,164 @@
+import os
+import re
+import heapq
+import argparse
+import numpy as np
+from process_text import SECONDS_PER_CHARACTER
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+INPUT_FILE = os.path.join("data", "sentences.txt")
+OUTPUT_FILE = os.path.join("data", "selected_sentences.txt")
+
+# Fraction of the corpus' distinct units the selection aims to cover.
+TARGET_COVERAGE = 0.99
+# Audio hours between two rows of the coverage report.
+REPORT_STEP_HOURS = 1.0
+
+WORD = re.compile(r"[а-яѐ-ӿ]+")
+# A number with optional decimal/fraction part, ordinal suffix and the word after it.
+NUMBER = re.compile(r"(\d+)(?:([.,/])(\d+))?(-[а-я]+)?(?:\s+([а-я]+))?")
+
+# --------------------------------------------------------------------
+# 2. Coverage units
+# --------------------------------------------------------------------
+
+def sentence_units(sentence):
+    """
+    Return the set of coverage units of a sentence: character bigrams and
+    trigrams inside words (with word boundaries marked by spaces), and digit
+    contexts - number length, decimal or fraction form, ordinal suffix and
+    the word that follows the number.
+    """
+    text = sentence.lower()
+    units = set()
+    for word in WORD.findall(text):
+        padded = f" {word} "
+        for i in range(len(padded) - 1):
+            units.add(padded[i:i + 2])
+            if i < len(padded) - 2:
+                units.add(padded[i:i + 3])
+    for digits, separator, fraction, suffix, following in NUMBER.findall(text):
+        units.add(f"#{len(digits)}")
+        if separator:
+            units.add(f"#{len(digits)}{separator}{len(fraction)}")
+        if suffix:
+            units.add(f"#{suffix}")
+        if following:
+            units.add(f"# {following}")
+    return units
+
+def build_unit_index(sentences):
+    """
+    Map every sentence to integer unit ids. Returns a flat int32 array of
+    unit ids, the offset of each sentence's units in it, and the number of
+    distinct units.
+    """
+    vocabulary = {}
+    unit_ids = []
+    offsets = [0]
+    for sentence in sentences:
+        for unit in sentence_units(sentence):
+            unit_ids.append(vocabulary.setdefault(unit, len(vocabulary)))
+        offsets.append(len(unit_ids))
+    return np.array(unit_ids, dtype=np.int32), np.array(offsets, dtype=np.int64), len(vocabulary)
+
+# --------------------------------------------------------------------
+# 3. Greedy selection
+# --------------------------------------------------------------------
+
+def select_sentences(sentences, target_coverage=TARGET_COVERAGE, budget_hours=None,
+                     seconds_per_character=SECONDS_PER_CHARACTER, report_step_hours=REPORT_STEP_HOURS):
+    """
+    Greedy weighted set cover: repeatedly pick the sentence with the most
+    not-yet-covered units per estimated second of audio, until target_coverage
+    of the distinct units is reached, budget_hours of audio is spent, or no
+    sentence adds anything new. Gains only shrink as units get covered, so a
+    max-heap with lazy re-evaluation finds the best sentence without rescoring
+    the whole corpus at each step.
+
+    Returns the indices of the selected sentences (in selection order) and a
+    report of (hours, sentences, coverage) rows, one per report_step_hours.
+    """
+    unit_ids, offsets, num_units = build_unit_index(sentences)
+    covered = np.zeros(num_units, dtype=bool)
+    costs = np.array([max(len(s), 1) * seconds_per_character for s in sentences])
+    budget_seconds = budget_hours * 3600 if budget_hours is not None else float("inf")
+
+    def gain(i):
+        return int(np.count_nonzero(~covered[unit_ids[offsets[i]:offsets[i + 1]]]))
+
+    heap = [(-(offsets[i + 1] - offsets[i]) / costs[i], i) for i in range(len(sentences))]
+    heapq.heapify(heap)
+
+    selected = []
+    report = []
+    covered_count = 0
+    spent = 0.0
+    next_report = report_step_hours * 3600
+    while heap and num_units and covered_count / num_units < target_coverage:
+        _, i = heapq.heappop(heap)
+        if spent + costs[i] > budget_seconds:
+            continue
+        current = gain(i)
+        if current == 0:
+            continue
+        score = -current / costs[i]
+        if heap and score > heap[0][0]:
+            # Stale priority: another sentence may now be better.
+            heapq.heappush(heap, (score, i))
+            continue
+
+        units = unit_ids[offsets[i]:offsets[i + 1]]
+        covered[units] = True
+        covered_count += current
+        spent += costs[i]
+        selected.append(i)
+        while spent >= next_report:
+            report.append((next_report / 3600, len(selected), covered_count / num_units))
+            next_report += report_step_hours * 3600
+
+    report.append((spent / 3600, len(selected), covered_count / num_units if num_units else 1.0))
+    return selected, report
+
+def print_report(report, total_sentences):
+    print(f"{'hours':>8} {'sentences':>10} {'coverage':>9}")
+    for hours, count, coverage in report:
+        print(f"{hours:8.2f} {count:10d} {coverage:9.2%}")
+    hours, count, coverage = report[-1]
+    print(f"Selected {count} of {total_sentences} sentences ({hours:.2f} hours) covering {coverage:.2%} of units.")
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def select_file(input_file=INPUT_FILE, output_file=OUTPUT_FILE, target_coverage=TARGET_COVERAGE,
+                budget_hours=None):
+    """
+    Select sentences from input_file and write them, in their original
+    order, to output_file.
+    """
+    with open(input_file, "r", encoding="utf-8") as infile:
+        sentences = [line.strip() for line in infile if line.strip()]
+
+    selected, report = select_sentences(sentences, target_coverage=target_coverage, budget_hours=budget_hours)
+    print_report(report, len(sentences))
+
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        outfile.write("\n".join(sentences[i] for i in sorted(selected)))
+    print(f"Selected sentences saved to {output_file}.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the smallest set of sentences that covers the corpus' units.")
+    parser.add_argument("--input", type=str, default=INPUT_FILE, help="Combined corpus to select from.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="Where to write the selected sentences.")
+    parser.add_argument("--coverage", type=float, default=TARGET_COVERAGE, help="Target unit coverage (0-1).")
+    parser.add_argument("--budget-hours", type=float, default=None, help="Maximum estimated hours of audio.")
+    args = parser.parse_args()
+
+    select_file(args.input, args.output, target_coverage=args.coverage, budget_hours=args.budget_hours)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import re
+import csv
+import json
+import heapq
+import argparse
+from process_text import SECONDS_PER_CHARACTER
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+INPUT_FILE = os.path.join("data", "sentences.txt")
+SHARD_DIR = os.path.join("data", "shards")
+NUM_SHARDS = 4
+METADATA_FILE = os.path.join("output_audio", "metadata.csv")
+
+# --------------------------------------------------------------------
+# 2. Sharding
+# --------------------------------------------------------------------
+
+def estimate_seconds(text):
+    """
+    Estimated audio duration of a sentence, from its character count.
+    """
+    return len(text) * SECONDS_PER_CHARACTER
+
+def first_free_id(metadata_file=METADATA_FILE):
+    """
+    The id after every sentence{id}.wav of the existing corpus, listed in
+    metadata_file or present in its folder; 1 when there is none.
+    """
+    pattern = re.compile(r"sentence(\d+)\.wav$")
+    ids = [0]
+    if os.path.exists(metadata_file):
+        with open(metadata_file, "r", encoding="utf-8", newline="") as infile:
+            ids += [int(m.group(1)) for row in csv.DictReader(infile) if (m := pattern.search(row.get("path") or ""))]
+    folder = os.path.dirname(metadata_file)
+    if os.path.isdir(folder):
+        ids += [int(m.group(1)) for name in os.listdir(folder) if (m := pattern.search(name))]
+    return max(ids) + 1
+
+def read_sentences(input_file, first_id=1):
+    """
+    Return (sentence_id, text) pairs. The id is first_id plus the 0-based
+    position of the sentence among the non-empty lines of input_file, so it
+    is global and stable for a given corpus no matter which shard, and so
+    which machine, the sentence lands on.
+    """
+    sentences = []
+    with open(input_file, "r", encoding="utf-8") as infile:
+        for line in infile:
+            line = line.strip()
+            if line:
+                sentences.append((first_id + len(sentences), line))
+    return sentences
+
+def balance_shards(sentences, num_shards, estimate=estimate_seconds):
+    """
+    Split sentences into num_shards groups of near-equal estimated audio
+    duration: longest sentences first, each into the currently lightest
+    shard (LPT). Returns a list of (seconds, [(sentence_id, text), ...]).
+    """
+    heap = [(0.0, shard) for shard in range(num_shards)]
+    shards = [[] for _ in range(num_shards)]
+    for sentence_id, text, seconds in sorted(
+        ((sentence_id, text, estimate(text)) for sentence_id, text in sentences),
+        key=lambda item: (-item[2], item[0]),
+    ):
+        load, shard = heapq.heappop(heap)
+        shards[shard].append((sentence_id, text))
+        heapq.heappush(heap, (load + seconds, shard))
+    loads = {shard: load for load, shard in heap}
+    return [(loads[shard], sorted(shards[shard])) for shard in range(num_shards)]
+
+def write_shards(shards, shard_dir=SHARD_DIR):
+    """
+    Write each shard to shard_dir/shard_XXX.tsv as "id<TAB>text" lines and a
+    shards.json summary with the sentence count and estimated hours per shard.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    summary = []
+    for index, (seconds, sentences) in enumerate(shards):
+        path = os.path.join(shard_dir, f"shard_{index:03d}.tsv")
+        with open(path, "w", encoding="utf-8") as outfile:
+            for sentence_id, text in sentences:
+                outfile.write(f"{sentence_id}\t{text}\n")
+        summary.append({"path": path, "sentences": len(sentences), "hours": round(seconds / 3600, 3)})
+        print(f"Shard {index}: {len(sentences)} sentences, {seconds / 3600:.2f} estimated hours -> {path}")
+    with open(os.path.join(shard_dir, "shards.json"), "w", encoding="utf-8") as outfile:
+        json.dump(summary, outfile, ensure_ascii=False, indent=2)
+
+def read_shard(path):
+    """
+    Read a shard file back as a list of (sentence_id, text) pairs.
+    """
+    sentences = []
+    with open(path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            sentence_id, _, text = line.rstrip("\n").partition("\t")
+            if text:
+                sentences.append((int(sentence_id), text))
+    return sentences
+
+# --------------------------------------------------------------------
+# 3. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the corpus into shards of equal estimated audio duration.")
+    parser.add_argument("--input", type=str, default=INPUT_FILE, help="Combined corpus, one sentence per line.")
+    parser.add_argument("--output-dir", type=str, default=SHARD_DIR, help="Folder for the shard files.")
+    parser.add_argument("--num-shards", type=int, default=NUM_SHARDS, help="Number of shards.")
+    parser.add_argument("--metadata", type=str, default=METADATA_FILE,
+                        help="metadata.csv of the existing corpus; shard ids start after its highest id.")
+    parser.add_argument("--first-id", type=int, default=None, help="Override the first sentence id.")
+    args = parser.parse_args()
+
+    # Every machine imports the existing corpus into its journal, so shard ids
+    # start past it; a colliding id would be refused rather than renumbered.
+    first_id = args.first_id or first_free_id(args.metadata)
+    print(f"Sentence ids start at {first_id}.")
+    shards = balance_shards(read_sentences(args.input, first_id), args.num_shards)
+    write_shards(shards, args.output_dir)
+
+if __name__ == "__main__":
+    main()
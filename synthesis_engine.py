@@ -0,0 +1,322 @@
+import os
+import time
+import queue
+import random
+import asyncio
+import threading
+import statistics
+from collections import deque
+import concurrent.futures
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+# Azure TTS limit is 200 transactions per second (TPS) for the Standard S0 tier.
+TRANSACTIONS_PER_SECOND = 200
+# Requests awaiting a response at any time.
+MAX_CONCURRENT_REQUESTS = 64
+# Jobs waiting in the submission queue; the producer blocks when it is full.
+MAX_QUEUED_JOBS = 2 * MAX_CONCURRENT_REQUESTS
+# Seconds of requests the token bucket may bank while idle.
+BURST_SECONDS = 0.05
+# Most wav files written by the writer thread in one batch.
+WRITE_BATCH_SIZE = 64
+
+# Adaptive (AIMD) concurrency: start here, grow by one request per round of
+# successes, and multiply by AIMD_DECREASE on throttling, on an error rate
+# above MAX_ERROR_RATE, or when the p95 latency exceeds LATENCY_FACTOR times
+# the best median latency seen, all measured over the last AIMD_WINDOW results.
+INITIAL_CONCURRENCY = 8
+AIMD_DECREASE = 0.7
+MAX_ERROR_RATE = 0.05
+LATENCY_FACTOR = 3.0
+AIMD_WINDOW = 100
+
+# Outcomes of one attempt, as returned by a classify(result, error) function.
+OK = "ok"
+THROTTLED = "throttled"
+RETRY = "retry"
+FAILED = "failed"
+# Attempts per job; throttled and retryable attempts back off exponentially.
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+# --------------------------------------------------------------------
+# 2. Rate limiting
+# --------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Asyncio token bucket: tokens refill continuously at `rate` per second up
+    to `burst`, and every request takes one. Waiters are served in arrival
+    order, so the request rate tracks `rate` however many workers wait. The
+    default burst is BURST_SECONDS worth of tokens: enough to absorb timer
+    jitter without letting a cold start fire a whole second of requests.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate * BURST_SECONDS, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            self.refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease limit on requests in flight,
+    as TCP does for its congestion window. Every round of `limit` successful
+    requests raises the limit by one. Throttling, too many errors or a
+    latency blow-up (requests queueing at the service) cut it by
+    `decrease`, at most once per median round trip, so that one burst of
+    rejections counts as a single signal. The limit therefore settles just
+    under whatever the service sustains.
+    """
+
+    def __init__(self, maximum=MAX_CONCURRENT_REQUESTS, initial=INITIAL_CONCURRENCY, minimum=1,
+                 decrease=AIMD_DECREASE, max_error_rate=MAX_ERROR_RATE, latency_factor=LATENCY_FACTOR,
+                 window=AIMD_WINDOW):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.decrease_factor = decrease
+        self.max_error_rate = max_error_rate
+        self.latency_factor = latency_factor
+        self.latencies = deque(maxlen=window)
+        self.failures = deque(maxlen=window)
+        self.baseline = None
+        self.last_decrease = 0.0
+        self.counts = {OK: 0, THROTTLED: 0, RETRY: 0, FAILED: 0}
+        self.peak = self.limit
+
+    @property
+    def allowed(self):
+        return max(int(self.limit), self.minimum)
+
+    def decrease(self):
+        now = time.monotonic()
+        cooldown = statistics.median(self.latencies) if self.latencies else RETRY_BASE_SECONDS
+        if now - self.last_decrease >= cooldown:
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            self.last_decrease = now
+            self.failures.clear()
+
+    def record(self, outcome, latency):
+        """
+        Update the limit with the outcome and latency of one attempt.
+        """
+        self.counts[outcome] += 1
+        self.failures.append(outcome != OK)
+        if outcome == THROTTLED:
+            self.decrease()
+            return
+        if outcome != OK:
+            if len(self.failures) >= self.failures.maxlen // 2 and \
+                    sum(self.failures) / len(self.failures) > self.max_error_rate:
+                self.decrease()
+            return
+
+        self.latencies.append(latency)
+        if len(self.latencies) == self.latencies.maxlen:
+            p50 = statistics.median(self.latencies)
+            p95 = statistics.quantiles(self.latencies, n=20)[-1]
+            self.baseline = p50 if self.baseline is None else min(self.baseline, p50)
+            if p95 > self.latency_factor * self.baseline:
+                self.decrease()
+                return
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self.peak = max(self.peak, self.limit)
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        return (f"concurrency {self.allowed} (peak {int(self.peak)}), {self.counts[OK]} ok, "
+                f"{self.counts[THROTTLED]} throttled, {self.counts[RETRY]} retried errors, "
+                f"{self.counts[FAILED]} failed; recent latency p50 {p50:.2f} s, p99 {p99:.2f} s")
+
+def backoff_seconds(attempt):
+    """
+    Exponential backoff with jitter before retry number attempt + 1.
+    """
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+def default_classify(result, error):
+    return OK if error is None else RETRY
+
+# --------------------------------------------------------------------
+# 3. Output
+# --------------------------------------------------------------------
+
+class BatchedWavWriter:
+    """
+    Writes audio bytes to disk on a background thread, so that neither the
+    event loop nor the synthesis threads wait on the filesystem. Pending
+    files are drained in batches of up to batch_size, each written to a
+    temporary name and renamed into place so a crash never leaves a partial
+    wav behind. An optional on_done callback runs, on the writer thread,
+    once its file is in place. A failed write or callback is recorded in
+    errors as (path, exception) and the thread moves on to the next file.
+    """
+
+    def __init__(self, batch_size=WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.written = 0
+        self.batches = 0
+        self.errors = []
+        self.crash = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, path, data, on_done=None):
+        self.queue.put((path, data, on_done))
+
+    def run(self):
+        try:
+            self.drain()
+        except BaseException as e:
+            self.crash = e
+
+    def drain(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is None:
+                    return
+                path, data, on_done = item
+                try:
+                    with open(path + ".tmp", "wb") as outfile:
+                        outfile.write(data)
+                    os.replace(path + ".tmp", path)
+                except Exception as e:
+                    self.errors.append((path, e))
+                    try:
+                        os.remove(path + ".tmp")
+                    except OSError:
+                        pass
+                    continue
+                self.written += 1
+                if on_done is not None:
+                    try:
+                        on_done()
+                    except Exception as e:
+                        self.errors.append((path, e))
+            self.batches += 1
+
+    def close(self):
+        """
+        Write everything still queued and stop the thread. Returns errors;
+        raises RuntimeError if the thread died with files still queued.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        if self.crash is not None:
+            lost = self.queue.qsize() - 1
+            raise RuntimeError(f"The wav writer stopped ({self.crash!r}); {lost} queued files were not written.")
+        if self.errors:
+            print(f"The wav writer had {len(self.errors)} errors.")
+        return self.errors
+
+# --------------------------------------------------------------------
+# 4. Engine
+# --------------------------------------------------------------------
+
+async def run_async(jobs, synthesize, on_result, tps=TRANSACTIONS_PER_SECOND,
+                    concurrency=MAX_CONCURRENT_REQUESTS, max_queued=MAX_QUEUED_JOBS,
+                    controller=None, classify=default_classify, max_attempts=MAX_ATTEMPTS):
+    """
+    Run synthesize(job) for every job, in order of the jobs iterable, with no
+    more than `tps` requests started per second and at most `concurrency` in
+    flight, or at most controller.allowed when an AIMDController is given.
+    Jobs are pulled from the iterable only as room frees up in a bounded
+    queue, so a large corpus never turns into a mountain of futures.
+
+    classify(result, error) labels each attempt OK, THROTTLED, RETRY or
+    FAILED. Throttled and retryable attempts are repeated after an
+    exponential backoff, up to max_attempts, without holding a request slot
+    while they wait, and every outcome is fed to the controller.
+
+    synthesize is a blocking call and runs on a thread; on_result(job, result,
+    error) runs on the event loop, one call at a time, with the last attempt
+    of each job. Returns the number of jobs run and the elapsed seconds.
+    """
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue(maxsize=max_queued)
+    bucket = TokenBucket(tps)
+    slots = asyncio.Condition()
+    in_flight = 0
+    count = 0
+
+    def allowed():
+        return controller.allowed if controller else concurrency
+
+    async def attempt(executor, job):
+        nonlocal in_flight
+        async with slots:
+            await slots.wait_for(lambda: in_flight < allowed())
+            in_flight += 1
+        await bucket.acquire()
+        start = time.perf_counter()
+        try:
+            result, error = await loop.run_in_executor(executor, synthesize, job), None
+        except Exception as e:
+            result, error = None, e
+        latency = time.perf_counter() - start
+        async with slots:
+            in_flight -= 1
+            slots.notify_all()
+        outcome = classify(result, error)
+        if controller:
+            controller.record(outcome, latency)
+        return result, error, outcome
+
+    async def produce():
+        for job in jobs:
+            await pending.put(job)
+        for _ in range(concurrency):
+            await pending.put(None)
+
+    async def work(executor):
+        nonlocal count
+        while (job := await pending.get()) is not None:
+            for tries in range(max_attempts):
+                result, error, outcome = await attempt(executor, job)
+                if outcome in (OK, FAILED) or tries == max_attempts - 1:
+                    break
+                await asyncio.sleep(backoff_seconds(tries))
+            count += 1
+            on_result(job, result, error)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        await asyncio.gather(produce(), *(work(executor) for _ in range(concurrency)))
+    return count, time.perf_counter() - start
+
+def run(jobs, synthesize, on_result, tps=TRANSACTIONS_PER_SECOND,
+        concurrency=MAX_CONCURRENT_REQUESTS, max_queued=MAX_QUEUED_JOBS,
+        controller=None, classify=default_classify, max_attempts=MAX_ATTEMPTS):
+    """
+    Blocking wrapper around run_async().
+    """
+    return asyncio.run(run_async(jobs, synthesize, on_result, tps, concurrency, max_queued,
+                                 controller, classify, max_attempts))
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from metadata_index import pack_strings, replace_dir
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+TOKEN_CACHE_DIR = "token_cache"
+# Bump when the layout of the cache changes, so old caches are ignored.
+CACHE_VERSION = 2
+# Arrays of a cache, each stored as <name>.npy in the cache folder.
+ARRAYS = ("token_ids", "token_offsets", "text_blob", "text_offsets", "text_hashes")
+
+def tokenizer_hash(config):
+    """
+    Hash of the settings of a Coqui config that change its token ids: the
+    characters config, the cleaner, phonemes and blank/eos/bos handling.
+    """
+    characters = config.characters.to_dict() if config.characters is not None else None
+    settings = {
+        "characters": characters,
+        "text_cleaner": getattr(config, "text_cleaner", None),
+        "use_phonemes": getattr(config, "use_phonemes", False),
+        "phoneme_language": getattr(config, "phoneme_language", None),
+        "add_blank": getattr(config, "add_blank", False),
+        "enable_eos_bos_chars": getattr(config, "enable_eos_bos_chars", False),
+        "version": CACHE_VERSION,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+# --------------------------------------------------------------------
+# 2. Building
+# --------------------------------------------------------------------
+
+def text_hash(text):
+    """
+    64-bit hash of a sentence, the sort and lookup key of a cache.
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def build_cache(directory, texts, token_ids):
+    """
+    Write texts and their token id sequences as one flat int32 array with
+    offsets, next to the texts as a UTF-8 blob with offsets, all ordered by
+    text_hash() so that a sentence is found by binary search over the
+    sorted hashes. The cache is written to a temporary folder and moved
+    into place.
+    """
+    hashes = np.array([text_hash(text) for text in texts], dtype=np.uint64)
+    order = np.argsort(hashes, kind="stable")
+    texts = [texts[i] for i in order]
+    token_ids = [token_ids[i] for i in order]
+    offsets = np.zeros(len(token_ids) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in token_ids], out=offsets[1:])
+    flat = np.fromiter((i for ids in token_ids for i in ids), dtype=np.int32, count=int(offsets[-1]))
+    text_blob, text_offsets = pack_strings(texts)
+    arrays = {"token_ids": flat, "token_offsets": offsets, "text_blob": text_blob, "text_offsets": text_offsets,
+              "text_hashes": hashes[order]}
+
+    tmp_dir = f"{directory}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), array)
+    with open(os.path.join(tmp_dir, "cache.json"), "w", encoding="utf-8") as outfile:
+        json.dump({"version": CACHE_VERSION, "texts": len(texts), "tokens": int(offsets[-1])}, outfile)
+    replace_dir(tmp_dir, directory)
+
+# --------------------------------------------------------------------
+# 3. Loading
+# --------------------------------------------------------------------
+
+class TokenCache:
+    """
+    Read-only, memory-mapped token ids of a set of sentences. Nothing is
+    decoded when a cache is opened: find(text) binary-searches the sorted
+    text hashes and compares the candidate rows' text in the mapped blob.
+    ids(text) returns the cached sequence as a list, like
+    TTSTokenizer.text_to_ids().
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "cache.json"), "r", encoding="utf-8") as infile:
+            header = json.load(infile)
+        if header["version"] != CACHE_VERSION:
+            raise ValueError(f"Token cache version {header['version']} in {directory}.")
+        for name in ARRAYS:
+            path = os.path.join(directory, name + ".npy")
+            try:
+                setattr(self, name, np.load(path, mmap_mode="r"))
+            except ValueError:
+                # An empty array cannot be memory mapped.
+                setattr(self, name, np.load(path))
+
+    def __len__(self):
+        return len(self.text_hashes)
+
+    def __contains__(self, text):
+        return self.find(text) >= 0
+
+    def row_ids(self, i):
+        return self.token_ids[self.token_offsets[i]:self.token_offsets[i + 1]].tolist()
+
+    def find(self, text):
+        """
+        Row of text in the cache, or -1.
+        """
+        key = np.uint64(text_hash(text))
+        i = int(self.text_hashes.searchsorted(key))
+        encoded = text.encode("utf-8")
+        blob = memoryview(self.text_blob)
+        while i < len(self.text_hashes) and self.text_hashes[i] == key:
+            if blob[int(self.text_offsets[i]):int(self.text_offsets[i + 1])] == encoded:
+                return i
+            i += 1
+        return -1
+
+    def ids(self, text):
+        i = self.find(text)
+        if i < 0:
+            raise KeyError(text)
+        return self.row_ids(i)
+
+def load_token_cache(tokenizer, config, texts, cache_dir=TOKEN_CACHE_DIR):
+    """
+    Open the token cache of config in cache_dir/<hash>/ for texts. The
+    cache is rebuilt with exactly the distinct texts when some are missing
+    from it, which are then tokenized with tokenizer, or when it holds
+    sentences no longer in texts. Changing the characters config changes
+    the hash, so a new cache is started instead of reusing stale ids.
+    """
+    directory = os.path.join(cache_dir, tokenizer_hash(config))
+    try:
+        cache = TokenCache(directory)
+    except (OSError, ValueError, KeyError):
+        cache = None
+    texts = list(dict.fromkeys(texts))
+    rows = [cache.find(text) for text in texts] if cache is not None else [-1] * len(texts)
+    missing = sum(row < 0 for row in rows)
+    if cache is not None and not missing and len(cache) == len(texts):
+        return cache
+    start = time.perf_counter()
+    token_ids = [cache.row_ids(row) if row >= 0 else tokenizer.text_to_ids(text) for text, row in zip(texts, rows)]
+    build_cache(directory, texts, token_ids)
+    dropped = len(cache) - (len(texts) - missing) if cache is not None else 0
+    print(f" > Tokenized {missing} new sentences into {directory} in {time.perf_counter() - start:.1f} s "
+          f"({len(texts) - missing} cached, {dropped} no longer used dropped).")
+    return TokenCache(directory)
+
+def attach_token_cache(tokenizer, config, samples, cache_dir=TOKEN_CACHE_DIR):
+    """
+    Make tokenizer.text_to_ids() serve the sentences of samples (formatter
+    items) from the on-disk cache; other texts, such as test sentences, are
+    still tokenized by the original method.
+    """
+    cache = load_token_cache(tokenizer, config, [item["text"] for item in samples], cache_dir)
+    original = tokenizer.text_to_ids
+
+    def text_to_ids(text, language=None):
+        row = cache.find(text)
+        if row >= 0:
+            return cache.row_ids(row)
+        return original(text, language=language)
+
+    tokenizer.text_to_ids = text_to_ids
+    return cache
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="List the token caches of the training scripts.")
+    parser.add_argument("--cache-dir", type=str, default=TOKEN_CACHE_DIR, help="Folder of the token caches.")
+    args = parser.parse_args()
+
+    names = sorted(os.listdir(args.cache_dir)) if os.path.isdir(args.cache_dir) else []
+    for name in names:
+        directory = os.path.join(args.cache_dir, name)
+        try:
+            cache = TokenCache(directory)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"{directory}: unreadable ({e})")
+            continue
+        print(f"{directory}: {len(cache)} sentences, {len(cache.token_ids)} tokens")
+    if not names:
+        print(f"No token caches in {args.cache_dir}.")
+
+if __name__ == "__main__":
+    main()
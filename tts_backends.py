@@ -0,0 +1,341 @@
+import time
+import random
+import hashlib
+import threading
+from collections import namedtuple
+from xml.sax.saxutils import escape
+import numpy as np
+from audio_tools import split_at_bookmarks, write_wav
+from synthesis_engine import FAILED, OK, RETRY, THROTTLED
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+ENV_FILE = "configs/.env"
+BACKENDS = ("azure", "openai", "coqui", "mock")
+
+VOICE_NAME = "bg-BG-KalinaNeural"
+LANGUAGE = "bg-BG"
+OUTPUT_FORMAT = "Riff22050Hz16BitMonoPcm"
+# Pause between the sentences of one SSML request; the cut falls in its middle.
+SSML_BREAK_MS = 300
+
+OPENAI_MODEL = "tts-1-hd"
+OPENAI_VOICE = "nova"
+# OpenAI's "pcm" response format: raw 16-bit mono samples at 24 kHz.
+OPENAI_SAMPLE_RATE = 24000
+
+# Sample rate and speaking rate of the mock backend's audio.
+MOCK_SAMPLE_RATE = 22050
+MOCK_SECONDS_PER_CHARACTER = 0.083
+
+# Beginnings of the error of a FAILED request that mean the endpoint itself
+# (key, region or subscription) refuses service, as opposed to a problem
+# with the sentence: Azure cancellation codes and OpenAI status errors.
+ENDPOINT_ERRORS = ("AuthenticationFailure", "Forbidden", "Error code: 401", "Error code: 403")
+
+# Outcome of one request: its status (OK, THROTTLED, RETRY or FAILED from
+# synthesis_engine), one wav per sentence when OK, and an error message.
+# stats is filled in by the pipeline with audio_tools.audio_stats() of each wav.
+Synthesis = namedtuple("Synthesis", ["status", "audio", "error", "stats"], defaults=[None])
+
+# --------------------------------------------------------------------
+# 2. Interface
+# --------------------------------------------------------------------
+
+class TTSBackend:
+    """
+    A speech synthesis service or model. synthesize(texts) makes one request
+    for one or more sentences (at most max_batch_size) and returns a
+    Synthesis; it is called from many threads at once. An exception raised
+    by synthesize counts as a retryable failure. voice and output_format
+    identify the audio it produces, for the audio cache.
+    """
+
+    name = None
+    voice = None
+    output_format = None
+    max_batch_size = 1
+
+    def synthesize(self, texts):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+def load_env(env_file=ENV_FILE):
+    from dotenv import dotenv_values
+
+    return dotenv_values(env_file)
+
+def make_backend(name, env_file=ENV_FILE, **options):
+    """
+    Create a backend by name; options are passed to its constructor, and
+    keys not given there come from env_file.
+    """
+    if name == "azure":
+        if "speech_key" not in options:
+            config = load_env(env_file)
+            options.update(speech_key=config["speech_key"], service_region=config["service_region"])
+        return AzureBackend(**options)
+    if name == "openai":
+        if "api_key" not in options:
+            options["api_key"] = load_env(env_file)["OPENAI_API_KEY"]
+        return OpenAIBackend(**options)
+    if name == "coqui":
+        return CoquiBackend(**options)
+    if name == "mock":
+        return MockBackend(**options)
+    raise ValueError(f"Unknown backend: {name} (expected one of {', '.join(BACKENDS)})")
+
+# --------------------------------------------------------------------
+# 3. Azure
+# --------------------------------------------------------------------
+
+def build_ssml(texts, voice=VOICE_NAME, language=LANGUAGE, break_ms=SSML_BREAK_MS):
+    """
+    Pack several sentences into one SSML document. Sentence i is wrapped in
+    the bookmarks "s{i}" and "e{i}", and sentences are separated by a pause
+    so that the audio can be cut cleanly between them.
+    """
+    body = f'<break time="{break_ms}ms"/>'.join(
+        f'<bookmark mark="s{i}"/>{escape(text)}<bookmark mark="e{i}"/>' for i, text in enumerate(texts)
+    )
+    return (
+        f'<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{language}">'
+        f'<voice name="{voice}">{body}</voice></speak>'
+    )
+
+class AzureSynthesizerPool:
+    """
+    One long-lived SpeechSynthesizer per worker thread. Synthesizers are
+    created on a thread's first request with no audio output device, so the
+    audio stays in memory as result.audio_data (a complete RIFF wav in the
+    configured output format), and their service connection is opened once
+    and reused for every later request. Bookmark events of a thread's
+    synthesizer are collected for speak_ssml().
+    """
+
+    def __init__(self, speech_config):
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.speechsdk = speechsdk
+        self.speech_config = speech_config
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.synthesizers = []
+
+    def synthesizer(self):
+        synthesizer = getattr(self.local, "synthesizer", None)
+        if synthesizer is None:
+            synthesizer = self.speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+            connection = self.speechsdk.Connection.from_speech_synthesizer(synthesizer)
+            connection.open(True)
+            marks = []
+            synthesizer.bookmark_reached.connect(lambda evt: marks.append((evt.text, evt.audio_offset)))
+            self.local.synthesizer = synthesizer
+            self.local.marks = marks
+            with self.lock:
+                self.synthesizers.append((synthesizer, connection))
+        return synthesizer
+
+    def speak(self, text):
+        """
+        Synthesize text on this thread's synthesizer and return the result.
+        """
+        return self.synthesizer().speak_text_async(text).get()
+
+    def speak_ssml(self, ssml):
+        """
+        Synthesize an SSML document and return the result together with the
+        (name, audio_offset_ticks) pairs of the bookmarks it reached.
+        """
+        synthesizer = self.synthesizer()
+        self.local.marks.clear()
+        result = synthesizer.speak_ssml_async(ssml).get()
+        return result, list(self.local.marks)
+
+    def close(self):
+        with self.lock:
+            for _, connection in self.synthesizers:
+                connection.close()
+            self.synthesizers.clear()
+
+# Cancellation codes worth another attempt; anything else (bad key, bad
+# request, forbidden) fails the same way every time.
+AZURE_THROTTLING_ERRORS = {"TooManyRequests"}
+AZURE_TRANSIENT_ERRORS = {"ConnectionFailure", "ServiceTimeout", "ServiceError", "ServiceUnavailable",
+                          "ServiceRedirectTemporary", "RuntimeError"}
+
+class AzureBackend(TTSBackend):
+    """
+    Azure Speech on pooled synthesizers. Several sentences go out as one
+    SSML request with bookmarks, and the audio is cut back into one wav per
+    sentence.
+    """
+
+    name = "azure"
+    max_batch_size = 64
+
+    def __init__(self, speech_key, service_region, voice=VOICE_NAME, output_format=OUTPUT_FORMAT):
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.speechsdk = speechsdk
+        self.voice = voice
+        self.output_format = output_format
+        self.region = service_region
+        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
+        speech_config.set_speech_synthesis_output_format(getattr(speechsdk.SpeechSynthesisOutputFormat, output_format))
+        speech_config.speech_synthesis_voice_name = voice
+        self.pool = AzureSynthesizerPool(speech_config)
+
+    def synthesize(self, texts):
+        if len(texts) == 1:
+            result, marks = self.pool.speak(texts[0]), None
+        else:
+            result, marks = self.pool.speak_ssml(build_ssml(texts, self.voice))
+        if result.reason == self.speechsdk.ResultReason.SynthesizingAudioCompleted:
+            if marks is None:
+                return Synthesis(OK, [result.audio_data], None)
+            return Synthesis(OK, split_at_bookmarks(result.audio_data, marks, len(texts)), None)
+
+        details = result.cancellation_details
+        if details.reason != self.speechsdk.CancellationReason.Error:
+            return Synthesis(FAILED, None, str(details.reason))
+        code = details.error_code.name
+        status = THROTTLED if code in AZURE_THROTTLING_ERRORS else RETRY if code in AZURE_TRANSIENT_ERRORS else FAILED
+        return Synthesis(status, None, f"{code}: {details.error_details}")
+
+    def close(self):
+        self.pool.close()
+
+# --------------------------------------------------------------------
+# 4. OpenAI
+# --------------------------------------------------------------------
+
+class OpenAIBackend(TTSBackend):
+    """
+    OpenAI text-to-speech, one sentence per request, as 24 kHz PCM.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key, model=OPENAI_MODEL, voice=OPENAI_VOICE):
+        import openai
+
+        self.openai = openai
+        self.client = openai.OpenAI(api_key=api_key)
+        self.model = model
+        self.voice = voice
+        self.output_format = f"{model}-pcm{OPENAI_SAMPLE_RATE}"
+
+    def synthesize(self, texts):
+        try:
+            response = self.client.audio.speech.create(
+                model=self.model, voice=self.voice, input=texts[0], response_format="pcm"
+            )
+        except self.openai.RateLimitError as e:
+            return Synthesis(THROTTLED, None, str(e))
+        except (self.openai.APIConnectionError, self.openai.APITimeoutError, self.openai.InternalServerError) as e:
+            return Synthesis(RETRY, None, str(e))
+        except self.openai.APIStatusError as e:
+            return Synthesis(FAILED, None, str(e))
+        samples = np.frombuffer(response.content, dtype="<i2")
+        return Synthesis(OK, [write_wav(samples, OPENAI_SAMPLE_RATE)], None)
+
+# --------------------------------------------------------------------
+# 5. Coqui
+# --------------------------------------------------------------------
+
+class CoquiBackend(TTSBackend):
+    """
+    A local Coqui TTS model, either a released model by name or a trained
+    checkpoint (model_path and config_path). The model runs one sentence at
+    a time behind a lock.
+    """
+
+    name = "coqui"
+
+    def __init__(self, model_name=None, model_path=None, config_path=None, gpu=False):
+        from TTS.api import TTS
+
+        if model_name:
+            self.tts = TTS(model_name=model_name, gpu=gpu)
+        else:
+            self.tts = TTS(model_path=model_path, config_path=config_path, gpu=gpu)
+        self.voice = model_name or model_path
+        self.output_format = f"pcm16-{self.tts.synthesizer.output_sample_rate}"
+        self.lock = threading.Lock()
+
+    def synthesize(self, texts):
+        with self.lock:
+            wav = self.tts.tts(texts[0])
+        samples = np.clip(np.asarray(wav, dtype=np.float32), -1.0, 1.0) * 32767
+        return Synthesis(OK, [write_wav(samples.astype(np.int16), self.tts.synthesizer.output_sample_rate)], None)
+
+# --------------------------------------------------------------------
+# 6. Mock
+# --------------------------------------------------------------------
+
+def mock_audio(text, rate=MOCK_SAMPLE_RATE):
+    """
+    Deterministic stand-in audio for a sentence: a quiet tone, with a pitch
+    derived from the text, as long as the sentence would take to say.
+    """
+    digest = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "little")
+    frequency = 120 + digest % 300
+    t = np.arange(int(max(len(text), 1) * MOCK_SECONDS_PER_CHARACTER * rate)) / rate
+    return write_wav((np.sin(2 * np.pi * frequency * t) * 3000).astype(np.int16), rate)
+
+class MockBackend(TTSBackend):
+    """
+    Offline stand-in for a TTS service, for benchmarking and profiling the
+    pipeline without spending quota. Every request takes `latency` seconds
+    plus uniform `jitter`, fails with probability failure_rate (retryable)
+    or throttle_rate (throttled), and returns mock_audio() for each
+    sentence, cut to a quarter with probability truncation_rate. With a
+    capacity, requests beyond that many in flight are throttled, the way a
+    region quota does, and past capacity / 2 in flight requests slow down
+    in proportion to the load.
+    """
+
+    name = "mock"
+    voice = "mock"
+    output_format = f"pcm16-{MOCK_SAMPLE_RATE}"
+    max_batch_size = 64
+
+    def __init__(self, latency=0.2, jitter=0.05, failure_rate=0.0, throttle_rate=0.0, truncation_rate=0.0,
+                 capacity=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.truncation_rate = truncation_rate
+        self.capacity = capacity
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+
+    def synthesize(self, texts):
+        with self.lock:
+            self.requests += 1
+            draw = self.rng.random()
+            if (self.capacity is not None and self.in_flight >= self.capacity) or draw < self.throttle_rate:
+                self.throttled += 1
+                return Synthesis(THROTTLED, None, "Too many requests")
+            self.in_flight += 1
+            load = max(1.0, self.in_flight / (self.capacity / 2)) if self.capacity else 1.0
+            delay = max(0.0, self.latency * load + self.rng.uniform(-self.jitter, self.jitter))
+        try:
+            time.sleep(delay)
+            if draw < self.throttle_rate + self.failure_rate:
+                return Synthesis(RETRY, None, "Injected failure")
+            if draw < self.throttle_rate + self.failure_rate + self.truncation_rate:
+                return Synthesis(OK, [mock_audio(text[:len(text) // 4]) for text in texts], None)
+            return Synthesis(OK, [mock_audio(text) for text in texts], None)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
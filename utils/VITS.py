@@ -1,4 +1,5 @@
 import os
+import sys
 import torch
 from trainer import Trainer, TrainerArgs
 from TTS.utils.audio import AudioProcessor
@@ -10,6 +11,13 @@ from TTS.tts.configs.shared_configs import CharactersConfig
 from TTS.tts.configs.shared_configs import BaseDatasetConfig
 from TTS.tts.models.vits import Vits, VitsArgs, VitsAudioConfig
 from TTS.tts.datasets.formatters import custom_bulgarian_formatter
+import TTS.tts.models.vits as vits_module
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_sampler import attach_to_model
+from token_cache import attach_token_cache
+from waveform_corpus import attach_to_vits, load_corpus
 
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 os.environ["CUDA_VISIBLE_DEVICES"] = "0"
@@ -18,6 +26,7 @@ torch.backends.cudnn.enabled = False
 torch.backends.cudnn.benchmark = False
 
 output_path = "train_dir"
+max_batch_frames = None
 if not os.path.exists(output_path):
     os.makedirs(output_path)
 
@@ -89,6 +98,12 @@ config.characters = CharactersConfig(
 
 ap = AudioProcessor.init_from_config(config)
 
+# VitsDataset loads its wavs with vits.load_audio, which never resamples;
+# serve them from one memory-mapped int16 file instead of a wav per sample.
+corpus = load_corpus(os.path.join(dataset_config.path, dataset_config.meta_file_train), config.audio.sample_rate,
+                     resample_audio=False)
+attach_to_vits(vits_module, corpus)
+
 tokenizer, config = TTSTokenizer.init_from_config(config)
 
 speaker_manager = SpeakerManager()
@@ -101,12 +116,19 @@ train_samples, eval_samples = load_tts_samples(
     formatter=custom_bulgarian_formatter,
 )
 
+# Reuse the token ids of earlier runs; a new characters config starts a new cache.
+attach_token_cache(tokenizer, config, train_samples + eval_samples)
+
 speaker_manager.set_ids_from_data(train_samples + eval_samples, parse_key="speaker_name")
 config.model_args.num_speakers = speaker_manager.num_speakers
 
 
 model = Vits(config, ap, tokenizer, speaker_manager)
 
+# Batch utterances of similar length; set max_batch_frames to cap batches by
+# padded mel frames instead of only by batch_size.
+attach_to_model(model, corpus, max_frames=max_batch_frames)
+
 trainer = Trainer(
     TrainerArgs(),
     config,
@@ -0,0 +1,232 @@
+import os
+import re
+import sys
+import json
+import time
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from argparse import RawTextHelpFormatter
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from numeric_sentences import QUOTAS, generate_numeric_file, scale_quotas
+from process_text import (
+    NEAR_DUPLICATE_THRESHOLD, count_numbers, count_total_words, combine_processed_texts,
+    iter_merged_lines, iter_text_chunks, normalize_text, split_normalized, write_lines,
+)
+
+# Synthetic corpus sizes in bytes; "books" is the real-world fixture.
+CORPUS_SIZES = {"1MB": 10**6, "100MB": 10**8, "1GB": 10**9}
+BOOKS_DIR = os.path.join(ROOT_DIR, "extracted_texts")
+OUTPUT_FILE = "benchmark_results.json"
+# Generated numeric sentences per MB of input text.
+NUMERIC_PER_MB = 1000
+SEED = 0
+
+# --------------------------------------------------------------------
+# 1. Synthetic corpora
+# --------------------------------------------------------------------
+
+def build_vocabulary(books_dir=BOOKS_DIR):
+    """
+    Return the distinct Cyrillic words of the real books, in first-seen order.
+    """
+    words = {}
+    for filename in sorted(os.listdir(books_dir)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(books_dir, filename), "r", encoding="utf-8") as infile:
+                for word in re.findall(r"[А-Яа-я]+", infile.read()):
+                    words.setdefault(word, None)
+    return list(words)
+
+def write_synthetic_corpus(path, size_bytes, vocabulary, seed=SEED):
+    """
+    Write about size_bytes of book-like Cyrillic text: random sentences drawn
+    from the vocabulary, mixed with numbers, quotes, Latin words, initials,
+    abbreviations and paragraph breaks so every cleaning rule has work to do.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(vocabulary, dtype=object)
+    extras = np.array(["„казва“", "2024", "3.14", "OK", "А. Б.", "т.е.", "р.", "—", "(бел.)", "12-ти"], dtype=object)
+    written = 0
+    with open(path, "w", encoding="utf-8") as outfile:
+        while written < size_bytes:
+            lengths = rng.integers(2, 20, 1000)
+            tokens = words[rng.integers(0, len(words), lengths.sum())]
+            extra = rng.random(len(tokens)) < 0.03
+            tokens[extra] = extras[rng.integers(0, len(extras), extra.sum())]
+            ends = rng.choice([". ", "! ", "? ", ".\n", "...\n\n"], len(lengths), p=[0.6, 0.1, 0.1, 0.15, 0.05])
+            block = []
+            start = 0
+            for length, end in zip(lengths, ends):
+                sentence = " ".join(tokens[start:start + length])
+                block.append(sentence[:1].upper() + sentence[1:] + end)
+                start += length
+            text = "".join(block)
+            outfile.write(text)
+            written += len(text.encode("utf-8"))
+    return written
+
+# --------------------------------------------------------------------
+# 2. Pipeline stages
+# --------------------------------------------------------------------
+
+def run_pipeline(input_paths, work_dir, numeric_count, dedup):
+    """
+    Run every text preparation stage on input_paths inside work_dir and
+    return per-stage seconds and the peak RSS of this process. Meant to run
+    in a fresh process so that the RSS belongs to this corpus only.
+    """
+    processed_dir = os.path.join(work_dir, "processed")
+    os.makedirs(processed_dir, exist_ok=True)
+    stages = {"clean": 0.0, "split": 0.0}
+
+    def sentences(path):
+        for chunk in iter_text_chunks(path):
+            start = time.perf_counter()
+            normalized = normalize_text(chunk)
+            middle = time.perf_counter()
+            chunk_sentences = split_normalized(normalized)
+            stages["clean"] += middle - start
+            stages["split"] += time.perf_counter() - middle
+            yield from chunk_sentences
+
+    start = time.perf_counter()
+    for index, path in enumerate(input_paths):
+        write_lines(os.path.join(processed_dir, f"book{index}_clean.txt"), iter_merged_lines(sentences(path)))
+    stages["write"] = time.perf_counter() - start - stages["clean"] - stages["split"]
+
+    start = time.perf_counter()
+    generate_numeric_file(
+        os.path.join(processed_dir, "generated_numeric_sentences.txt"), scale_quotas(QUOTAS, numeric_count), seed=SEED
+    )
+    stages["numeric"] = time.perf_counter() - start
+
+    combined_path = os.path.join(work_dir, "sentences.txt")
+    start = time.perf_counter()
+    combine_processed_texts(
+        dedup_threshold=NEAR_DUPLICATE_THRESHOLD if dedup else None, seed=SEED,
+        processed_dir=processed_dir, combined_path=combined_path,
+    )
+    stages["combine"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total_words = 0
+    total_numbers = 0
+    with open(combined_path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            total_words += count_total_words(line)
+            total_numbers += count_numbers(line)
+    stages["stats"] = time.perf_counter() - start
+
+    return {
+        "stages": stages,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "words": total_words,
+        "numbers": total_numbers,
+    }
+
+def benchmark(name, input_paths, dedup):
+    """
+    Benchmark one corpus in a spawned child process and summarize the result.
+    """
+    size_mb = sum(os.path.getsize(p) for p in input_paths) / 1e6
+    numeric_count = max(int(size_mb * NUMERIC_PER_MB), 1)
+    with tempfile.TemporaryDirectory(prefix="bench_") as work_dir:
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            result = pool.apply(run_pipeline, (input_paths, work_dir, numeric_count, dedup))
+
+    total = sum(result["stages"].values())
+    result.update({
+        "input_mb": round(size_mb, 3),
+        "total_seconds": total,
+        "throughput_mb_s": size_mb / total if total else 0.0,
+        "stage_mb_s": {stage: size_mb / t if t else 0.0 for stage, t in result["stages"].items()},
+    })
+    print(f" > {name}: {size_mb:.1f} MB in {total:.2f} s ({result['throughput_mb_s']:.2f} MB/s), "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    for stage, seconds in result["stages"].items():
+        print(f"     {stage:>8}: {seconds:8.3f} s")
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_file):
+    """
+    Print the throughput of each corpus relative to a previous results file.
+    """
+    with open(baseline_file, "r", encoding="utf-8") as infile:
+        baseline = json.load(infile)
+    print(f" > Compared to {baseline_file} ({baseline.get('commit')}):")
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous and previous["throughput_mb_s"]:
+            ratio = result["throughput_mb_s"] / previous["throughput_mb_s"]
+            print(f"     {name}: {ratio:.2f}x throughput, peak RSS {previous['peak_rss_mb']:.0f} -> "
+                  f"{result['peak_rss_mb']:.0f} MB")
+
+# --------------------------------------------------------------------
+# 3. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Offline benchmark of the text preparation pipeline (clean, split, numeric
+        generation, combine, stats) on synthetic Cyrillic corpora and on the books
+        in extracted_texts. Every corpus runs in a fresh process to measure its peak RSS.
+        Example run: python utils/benchmark_pipeline.py --sizes books,1MB,100MB --compare old.json
+        """,
+        formatter_class=RawTextHelpFormatter,
+    )
+    parser.add_argument("--sizes", type=str, default="books,1MB",
+                        help=f"Comma-separated corpora: books, {', '.join(CORPUS_SIZES)}.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="JSON file for the results.")
+    parser.add_argument("--compare", type=str, default=None, help="Previous results file to compare against.")
+    parser.add_argument("--no-dedup", action="store_true", help="Skip deduplication in the combine stage.")
+    args = parser.parse_args()
+
+    results = {}
+    vocabulary = None
+    for name in args.sizes.split(","):
+        if name == "books":
+            paths = [os.path.join(BOOKS_DIR, f) for f in sorted(os.listdir(BOOKS_DIR)) if f.endswith(".txt")]
+            results[name] = benchmark(name, paths, not args.no_dedup)
+            continue
+        vocabulary = vocabulary or build_vocabulary()
+        with tempfile.TemporaryDirectory(prefix="corpus_") as corpus_dir:
+            path = os.path.join(corpus_dir, f"synthetic_{name}.txt")
+            write_synthetic_corpus(path, CORPUS_SIZES[name], vocabulary)
+            results[name] = benchmark(name, [path], not args.no_dedup)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as outfile:
+        json.dump(report, outfile, indent=2)
+    print(f" > Results saved to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
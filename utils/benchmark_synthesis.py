@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import argparse
+import tempfile
+import threading
+from argparse import RawTextHelpFormatter
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from duration_model import DurationModel
+from job_journal import JobJournal
+from tts_backends import TTSBackend, make_backend
+from generate_data import schedule_longest_first, synthesize_jobs
+
+INPUT_FILE = os.path.join(ROOT_DIR, "data", "sentences.txt")
+OUTPUT_FILE = "synthesis_benchmark.json"
+
+# --------------------------------------------------------------------
+# 1. Timing
+# --------------------------------------------------------------------
+
+class TimedBackend(TTSBackend):
+    """
+    Wraps a backend and records the wall-clock latency of every request.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.voice = backend.voice
+        self.output_format = backend.output_format
+        self.max_batch_size = backend.max_batch_size
+        self.lock = threading.Lock()
+        self.latencies = []
+
+    def synthesize(self, texts):
+        start = time.perf_counter()
+        try:
+            return self.backend.synthesize(texts)
+        finally:
+            with self.lock:
+                self.latencies.append(time.perf_counter() - start)
+
+    def close(self):
+        self.backend.close()
+
+# --------------------------------------------------------------------
+# 2. Benchmark
+# --------------------------------------------------------------------
+
+def read_sentences(path, count):
+    sentences = []
+    with open(path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            if line.strip():
+                sentences.append((len(sentences) + 1, line.strip()))
+                if len(sentences) == count:
+                    break
+    return sentences
+
+def benchmark(sentences, backend_options, tps, concurrency, adaptive, batch_size):
+    """
+    Synthesize the sentences with the mock backend through the full pipeline
+    (scheduling, engine, wav writer, journal) in a temporary folder and
+    return throughput, request latency percentiles and peak RSS.
+    """
+    backend = TimedBackend(make_backend("mock", **backend_options))
+    with tempfile.TemporaryDirectory(prefix="synth_") as work_dir:
+        journal = JobJournal(os.path.join(work_dir, "journal.sqlite"))
+        jobs = schedule_longest_first(journal.assign(sentences), DurationModel())
+        stats = synthesize_jobs(jobs, backend, journal, folder=work_dir, tps=tps, concurrency=concurrency,
+                                adaptive=adaptive, batch_size=batch_size, verbose=False)
+        counts = journal.counts()
+        journal.close()
+    backend.close()
+
+    latencies = np.array(backend.latencies) if backend.latencies else np.zeros(1)
+    elapsed = stats["elapsed"]
+    return {
+        "sentences": len(sentences),
+        "written": stats["written"],
+        "requests": len(backend.latencies),
+        "throttled": backend.backend.throttled,
+        "journal": counts,
+        "elapsed_seconds": elapsed,
+        "sentences_per_second": stats["written"] / elapsed if elapsed else 0.0,
+        "audio_hours": sum(stats["measured"]) / 3600,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "concurrency": stats["controller"].summary() if stats["controller"] else None,
+    }
+
+# --------------------------------------------------------------------
+# 3. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Offline benchmark of the synthesis pipeline against the mock TTS backend:
+        deterministic audio with configurable latency, jitter, failures and capacity,
+        so that throughput, p50/p99 request latency and memory can be measured
+        without spending quota.
+        Example run: python utils/benchmark_synthesis.py --sentences 5000 --capacity 32 --batch_size 8
+        """,
+        formatter_class=RawTextHelpFormatter,
+    )
+    parser.add_argument("--input", type=str, default=INPUT_FILE, help="Sentences to synthesize, one per line.")
+    parser.add_argument("--sentences", type=int, default=2000, help="Number of sentences to take from the input.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock request latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Uniform jitter of the latency in seconds.")
+    parser.add_argument("--failure_rate", type=float, default=0.01, help="Fraction of requests that fail (retried).")
+    parser.add_argument("--throttle_rate", type=float, default=0.0, help="Fraction of requests throttled.")
+    parser.add_argument("--capacity", type=int, default=None, help="Requests in flight the mock accepts.")
+    parser.add_argument("--tps", type=float, default=1000, help="Token-bucket rate.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Upper bound on requests in flight.")
+    parser.add_argument("--fixed", action="store_true", help="Keep concurrency fixed instead of AIMD.")
+    parser.add_argument("--batch_size", type=int, default=1, help="Sentences per request.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="JSON file for the results.")
+    args = parser.parse_args()
+
+    sentences = read_sentences(args.input, args.sentences)
+    backend_options = {
+        "latency": args.latency, "jitter": args.jitter, "failure_rate": args.failure_rate,
+        "throttle_rate": args.throttle_rate, "capacity": args.capacity,
+    }
+    result = benchmark(sentences, backend_options, args.tps, args.concurrency, not args.fixed, args.batch_size)
+
+    print(f" > {result['written']} of {result['sentences']} sentences in {result['elapsed_seconds']:.2f} s "
+          f"({result['sentences_per_second']:.1f} sentences/s, {result['audio_hours']:.2f} hours of audio)")
+    print(f" > {result['requests']} requests, {result['throttled']} throttled, latency "
+          f"p50 {result['latency_p50_ms']:.1f} ms, p99 {result['latency_p99_ms']:.1f} ms")
+    print(f" > Peak RSS {result['peak_rss_mb']:.0f} MB")
+    if result["concurrency"]:
+        print(f" > Adaptive concurrency: {result['concurrency']}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": vars(args),
+        "result": result,
+    }
+    with open(args.output, "w", encoding="utf-8") as outfile:
+        json.dump(report, outfile, indent=2)
+    print(f" > Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+from argparse import RawTextHelpFormatter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_tools import read_pcm
+from tts_backends import mock_audio
+from waveform_corpus import load_corpus
+
+SENTENCE = "Това е примерно изречение за зареждане на данни"
+
+def read_syscalls():
+    """
+    Read system calls made by this process so far (Linux only; loose files
+    also cost an open and a close each, which this does not count).
+    """
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["syscr"])
+    except OSError:
+        return 0
+
+def write_fixture(folder, files, seed=0):
+    """
+    Write files mock wavs of 1 to 10 seconds and their metadata.csv.
+    """
+    rng = random.Random(seed)
+    metadata_file = os.path.join(folder, "metadata.csv")
+    with open(metadata_file, "w", encoding="utf-8", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(["path", "sentence", "speaker"])
+        for i in range(1, files + 1):
+            text = " ".join([SENTENCE] * rng.randint(1, 3))[:rng.randint(12, 120)]
+            with open(os.path.join(folder, f"sentence{i}.wav"), "wb") as wav:
+                wav.write(mock_audio(text))
+            writer.writerow([f"sentence{i}.wav", text, "1"])
+    return metadata_file
+
+def epoch(load, paths, order):
+    """
+    Load every sample once in the given order and touch every page of its
+    audio; returns samples/s, audio samples read and the read syscalls made.
+    """
+    reads_before = read_syscalls()
+    start = time.perf_counter()
+    total = checksum = 0
+    for i in order:
+        samples = load(paths[i])
+        # One int16 in every 4 KB page.
+        checksum += int(samples[::2048].sum())
+        total += len(samples)
+    elapsed = time.perf_counter() - start
+    reads_after = read_syscalls()
+    return len(order) / elapsed, total, reads_after - reads_before
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Compare loading training audio from loose wav files with loading it from the
+        packed int16 corpus (waveform_corpus.py): samples per second and read syscalls
+        per epoch, in shuffled order as a training loader reads them. Uses the wavs of
+        --metadata when given, otherwise a temporary fixture of mock wavs.
+        Example run: python utils/benchmark_waveforms.py --metadata output_audio/metadata.csv --epochs 3
+        """,
+        formatter_class=RawTextHelpFormatter,
+    )
+    parser.add_argument("--metadata", type=str, default=None, help="metadata.csv of real wavs to benchmark on.")
+    parser.add_argument("--files", type=int, default=2000, help="Mock wavs in the temporary fixture.")
+    parser.add_argument("--epochs", type=int, default=2, help="Shuffled passes over the data per loader.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="waves_") as folder:
+        metadata_file = args.metadata or write_fixture(folder, args.files)
+        root = os.path.dirname(metadata_file)
+        start = time.perf_counter()
+        corpus = load_corpus(metadata_file)
+        print(f" > Corpus of {len(corpus)} wavs ready in {time.perf_counter() - start:.1f} s")
+        paths = [os.path.join(root, name) for name in corpus.positions]
+
+        def load_loose(path):
+            with open(path, "rb") as f:
+                return read_pcm(f.read())[0]
+
+        rng = np.random.default_rng(0)
+        for name, load in (("loose wav files", load_loose), ("packed corpus", corpus.samples)):
+            for e in range(args.epochs):
+                rate, total, reads = epoch(load, paths, rng.permutation(len(paths)))
+                print(f" > {name:>15}, epoch {e + 1}: {rate:8.0f} samples/s, {total / 1e6:.1f} M audio samples, "
+                      f"{reads / len(paths):.1f} read syscalls per sample")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import argparse
+from argparse import RawTextHelpFormatter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_text import EXTRACTED_DIR, split_sentences, split_sentences_reference
+
+
+def measure(fn, text, repeat):
+    """
+    Run fn(text) repeat times and return the output and the best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return output, best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Golden-output check and throughput benchmark for the compiled normalizer.
+        Compares split_sentences against split_sentences_reference on every book.
+        Example run: python utils/check_normalizer.py --repeat 5
+        """,
+        formatter_class=RawTextHelpFormatter,
+    )
+    parser.add_argument("--input_dir", type=str, default=EXTRACTED_DIR, help="Folder with raw .txt books.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per book (best is kept).")
+    args = parser.parse_args()
+
+    total_mb = 0.0
+    total_reference = 0.0
+    total_compiled = 0.0
+    mismatches = 0
+
+    for filename in sorted(os.listdir(args.input_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(args.input_dir, filename), "r", encoding="utf-8") as infile:
+            text = infile.read()
+        size_mb = len(text.encode("utf-8")) / 1e6
+
+        expected, reference_time = measure(split_sentences_reference, text, args.repeat)
+        actual, compiled_time = measure(split_sentences, text, args.repeat)
+
+        status = "OK" if actual == expected else "MISMATCH"
+        if actual != expected:
+            mismatches += 1
+        print(
+            f" > {filename}: {status}, {len(actual)} sentences, "
+            f"reference {size_mb / reference_time:.1f} MB/s, compiled {size_mb / compiled_time:.1f} MB/s"
+        )
+        total_mb += size_mb
+        total_reference += reference_time
+        total_compiled += compiled_time
+
+    if total_mb:
+        print(f" > Reference: {total_mb / total_reference:.1f} MB/s")
+        print(f" > Compiled:  {total_mb / total_compiled:.1f} MB/s ({total_reference / total_compiled:.2f}x)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
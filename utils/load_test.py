@@ -0,0 +1,89 @@
+import os
+import sys
+import argparse
+from argparse import RawTextHelpFormatter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthesis_engine import AIMDController, run
+from tts_backends import MockBackend
+from endpoint_pool import Endpoint, EndpointPool
+from generate_data import classify_result
+
+SENTENCE = "Това е примерно изречение за натоварване."
+
+def load_test(capacity, jobs, latency, max_concurrency, tps, adaptive):
+    """
+    Push jobs through the engine against a MockBackend with the given
+    capacity and print the throughput reached and where concurrency settled.
+    """
+    backend = MockBackend(latency=latency, jitter=0.0, capacity=capacity)
+    controller = AIMDController(maximum=max_concurrency) if adaptive else None
+    count, elapsed = run(
+        range(jobs), lambda job: backend.synthesize([SENTENCE]), lambda *args: None,
+        tps=tps, concurrency=max_concurrency, controller=controller, classify=classify_result,
+    )
+    # The mock's throughput peaks at capacity / 2 requests in flight.
+    best = capacity / 2 / latency
+    print(f"Capacity {capacity}: {count / elapsed:.1f} requests per second ({count / elapsed / best:.0%} of the "
+          f"{best:.0f} sustainable), {backend.throttled} of {backend.requests} requests throttled.")
+    if controller:
+        print(f"    {controller.summary()}")
+
+def fan_out_test(endpoints, capacity, endpoint_tps, jobs, latency, unhealthy):
+    """
+    Push jobs through an EndpointPool of mock endpoints, each limited to
+    endpoint_tps requests per second, plus optionally one endpoint that
+    fails every request, and print the aggregate and per-endpoint results.
+    """
+    pool = [Endpoint(f"mock-{i + 1}", MockBackend(latency=latency, jitter=0.0, capacity=capacity, seed=i),
+                     tps=endpoint_tps, concurrency=capacity) for i in range(endpoints)]
+    if unhealthy:
+        pool.append(Endpoint("broken", MockBackend(latency=latency, failure_rate=1.0), tps=endpoint_tps,
+                             concurrency=capacity))
+    backend = EndpointPool(pool)
+    count, elapsed = run(
+        range(jobs), lambda job: backend.synthesize([SENTENCE]), lambda *args: None,
+        tps=backend.tps, concurrency=backend.concurrency, classify=classify_result,
+    )
+    print(f"{endpoints} endpoints: {count / elapsed:.1f} requests per second "
+          f"({count / elapsed / (endpoints * endpoint_tps):.0%} of the {endpoints * endpoint_tps:.0f} quota).")
+    for line in backend.summary().splitlines():
+        print(f"    {line}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Load-test the synthesis engine against local mock endpoints that throttle
+        requests beyond their capacity. With the adaptive (AIMD) controller the
+        throughput should settle near the sustainable maximum for every capacity.
+        Example run: python utils/load_test.py --capacity 8 32 96 --jobs 3000
+        With --endpoints, jobs fan out over that many mock endpoints of --endpoint_tps
+        requests per second each; throughput should grow linearly with their number.
+        Example run: python utils/load_test.py --endpoints 1 2 4 --endpoint_tps 50 --unhealthy
+        """,
+        formatter_class=RawTextHelpFormatter,
+    )
+    parser.add_argument("--capacity", type=int, nargs="+", default=[8, 32, 96],
+                        help="Concurrent requests each mock endpoint accepts.")
+    parser.add_argument("--jobs", type=int, default=3000, help="Requests per test.")
+    parser.add_argument("--latency", type=float, default=0.1, help="Unloaded latency of the mock in seconds.")
+    parser.add_argument("--max_concurrency", type=int, default=256, help="Upper bound on requests in flight.")
+    parser.add_argument("--tps", type=float, default=10000, help="Token-bucket rate.")
+    parser.add_argument("--fixed", action="store_true", help="Keep max_concurrency fixed instead of AIMD.")
+    parser.add_argument("--endpoints", type=int, nargs="+", default=None,
+                        help="Numbers of mock endpoints to fan out over instead of the capacity test.")
+    parser.add_argument("--endpoint_tps", type=float, default=50, help="Requests per second of each endpoint.")
+    parser.add_argument("--unhealthy", action="store_true", help="Add an endpoint that fails every request.")
+    args = parser.parse_args()
+
+    if args.endpoints:
+        for endpoints in args.endpoints:
+            fan_out_test(endpoints, args.capacity[0], args.endpoint_tps, args.jobs, args.latency, args.unhealthy)
+        return
+    for capacity in args.capacity:
+        load_test(capacity, args.jobs, args.latency, args.max_concurrency, args.tps, not args.fixed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 import os
+import csv
 import librosa
 
 audio_folder = "output_audio"
+metadata_file = os.path.join(audio_folder, "metadata.csv")
 total_duration = 0
+measured = 0
 
-for file_name in os.listdir(audio_folder):
-    if file_name.endswith(".wav"):
-        file_path = os.path.join(audio_folder, file_name)
+# generate_data.py records every wav's duration in metadata.csv; only rows
+# without it (older runs) are loaded from disk.
+with open(metadata_file, "r", encoding="utf-8", newline="") as infile:
+    for row in csv.DictReader(infile):
+        if row.get("duration"):
+            total_duration += float(row["duration"])
+            continue
+        file_path = os.path.join(audio_folder, row["path"])
         try:
             y, sr = librosa.load(file_path, sr=None)
             total_duration += librosa.get_duration(y=y, sr=sr)
+            measured += 1
         except Exception as e:
-            print(f"Skipping {file_name} due to error: {e}")
+            print(f"Skipping {row['path']} due to error: {e}")
 
 print(f"Total audio duration: {total_duration / 3600:.2f} hours ({total_duration:.2f} seconds)")
+if measured:
+    print(f"Loaded {measured} wav files without a recorded duration.")
 
 # Total audio duration: 31.46 hours (113242.99 seconds)
-# Total audio duration: 24.80 hours (89284.86 seconds)
\ No newline at end of file
+# Total audio duration: 24.80 hours (89284.86 seconds)
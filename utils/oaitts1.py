@@ -1,18 +1,20 @@
-from openai import OpenAI
+import os
+import sys
 from pathlib import Path
-from dotenv import dotenv_values
 
-config = dotenv_values("configs/.env")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-client = OpenAI(
-    api_key=config["OPENAI_API_KEY"],
-)
+from synthesis_engine import OK
+from tts_backends import make_backend
+
+backend = make_backend("openai")
 
-response = client.audio.speech.create(
-    model="tts-1-hd",
-    voice="nova",
-    input="Тук е мястото да очертая фокуса на настоящия сбор­ник, заявен в подзаглавието: Към феноменология на ан­тропологичния опит.",
+result = backend.synthesize(
+    ["Тук е мястото да очертая фокуса на настоящия сбор­ник, заявен в подзаглавието: Към феноменология на ан­тропологичния опит."]
 )
 
 speech_file_path = Path(__file__).parent / "samlpe.wav"
-response.write_to_file(speech_file_path)
+if result.status == OK:
+    speech_file_path.write_bytes(result.audio[0])
+else:
+    print(f"Error: {result.error}")
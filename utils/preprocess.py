@@ -1,4 +1,7 @@
 import glob
+import hashlib
+import json
+import multiprocessing
 import os
 from pathlib import Path
 
@@ -38,6 +41,145 @@ def preprocess_wav_files(out_path: str, config: Coqpit, ap: AudioProcessor):
             np.save(quant_path, quant)
 
 
+def audio_config_hash(ap: AudioProcessor) -> str:
+    """Hash of every setting of the audio processor that changes its mel spectrograms."""
+    settings = {k: v for k, v in vars(ap).items() if isinstance(v, (int, float, str, bool, type(None)))}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class MelStore:
+    """Mel spectrograms of a whole dataset in one contiguous memory-mapped file.
+
+    The store for an audio processor config lives in ``<out_path>/mel_store/<hash>.bin`` (frames x n_mels,
+    row-major) with an append-only ``<hash>.jsonl`` index of ``{"key", "offset", "frames", "size", "mtime_ns"}``
+    records, one per wav file, where the key is the wav path relative to the data folder. A later record for the
+    same key replaces an earlier one.
+
+    Args:
+        store_path (str): Folder of the store.
+        config_hash (str): Hash of the audio processor config, see ``audio_config_hash()``.
+    """
+
+    def __init__(self, store_path: str, config_hash: str):
+        self.data_file = os.path.join(store_path, config_hash + ".bin")
+        self.index_file = os.path.join(store_path, config_hash + ".jsonl")
+        self.header_file = os.path.join(store_path, config_hash + ".json")
+        with open(self.header_file, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        self.num_mels = header["num_mels"]
+        self.dtype = np.dtype(header["dtype"])
+        self.entries = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):  # a torn last line is ignored
+                        record = json.loads(line)
+                        self.entries[record["key"]] = record
+        self.frames = max((e["offset"] + e["frames"] for e in self.entries.values()), default=0)
+        self.data = (
+            np.memmap(self.data_file, dtype=self.dtype, mode="r", shape=(self.frames, self.num_mels))
+            if self.frames
+            else np.zeros((0, self.num_mels), dtype=self.dtype)
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def keys(self):
+        return self.entries.keys()
+
+    def get(self, key: str) -> np.ndarray:
+        """Zero-copy ``[num_mels, frames]`` view of the mel spectrogram of one wav file."""
+        entry = self.entries[key]
+        return self.data[entry["offset"] : entry["offset"] + entry["frames"]].T
+
+
+def _init_mel_worker(ap):
+    global _worker_ap
+    _worker_ap = ap
+
+
+def _extract_mel(path):
+    mel = _worker_ap.melspectrogram(_worker_ap.load_wav(path))
+    return path, np.ascontiguousarray(mel.T)
+
+
+def build_mel_store(
+    out_path: str, data_path: str, ap: AudioProcessor, num_workers: int = None, dtype: str = "float32"
+) -> dict:
+    """Extract the mel spectrograms of every wav file under ``data_path`` into a ``MelStore``.
+
+    Files are processed on a pool of ``num_workers`` processes and appended to the store's single data file. The
+    store resumes: wav files already in it with the same size and modification time are skipped, and data written
+    after the last index record by an interrupted run is cut off.
+
+    Args:
+        out_path (str): Parent folder of the ``mel_store`` folder.
+        data_path (str): Folder searched recursively for wav files.
+        ap (AudioProcessor): Audio processor; its settings select the store.
+        num_workers (int): Extraction processes. Defaults to the number of CPUs.
+        dtype (str): ``float32`` or ``float16`` storage, used when the store is created.
+
+    Returns:
+        dict: The store, the number of files and frames extracted in this run, and the files skipped.
+    """
+    store_path = os.path.join(out_path, "mel_store")
+    os.makedirs(store_path, exist_ok=True)
+    config_hash = audio_config_hash(ap)
+    header_file = os.path.join(store_path, config_hash + ".json")
+    if not os.path.exists(header_file):
+        with open(header_file, "w", encoding="utf-8") as f:
+            json.dump({"num_mels": ap.num_mels, "dtype": dtype, "sample_rate": ap.sample_rate}, f)
+    index_file = os.path.join(store_path, config_hash + ".jsonl")
+    if os.path.exists(index_file):
+        # Drop a record torn by an interrupted run before appending after it.
+        with open(index_file, "rb+") as f:
+            f.truncate(f.read().rfind(b"\n") + 1)
+    store = MelStore(store_path, config_hash)
+
+    todo, skipped = [], 0
+    for path in sorted(find_wav_files(data_path)):
+        stat = os.stat(path)
+        entry = store.entries.get(os.path.relpath(path, data_path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            skipped += 1
+        else:
+            todo.append(path)
+
+    frames = store.frames
+    item_size = store.num_mels * store.dtype.itemsize
+    with open(store.data_file, "ab") as data_file:
+        data_file.truncate(frames * item_size)
+    extracted = extracted_frames = 0
+    with open(store.data_file, "ab") as data_file, open(store.index_file, "a", encoding="utf-8") as index_file:
+        with multiprocessing.Pool(num_workers, initializer=_init_mel_worker, initargs=(ap,)) as pool:
+            for path, mel in tqdm(pool.imap_unordered(_extract_mel, todo, chunksize=16), total=len(todo)):
+                stat = os.stat(path)
+                data_file.write(mel.astype(store.dtype).tobytes())
+                # The data goes to disk before the record that points at it.
+                data_file.flush()
+                record = {
+                    "key": os.path.relpath(path, data_path),
+                    "offset": frames,
+                    "frames": len(mel),
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+                index_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                frames += len(mel)
+                extracted += 1
+                extracted_frames += len(mel)
+    return {
+        "store": MelStore(store_path, config_hash),
+        "files": extracted,
+        "frames": extracted_frames,
+        "skipped": skipped,
+    }
+
+
 def find_wav_files(data_path, file_ext="wav"):
     wav_paths = glob.glob(os.path.join(data_path, "**", f"*.{file_ext}"), recursive=True)
     return wav_paths
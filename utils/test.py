@@ -1,17 +1,47 @@
 import os
+import time
+import argparse
+from argparse import RawTextHelpFormatter
+from TTS.config import load_config
 from TTS.utils.audio import AudioProcessor
-from coqpit import Coqpit
-from preprocess import preprocess_wav_files
-import json
+from preprocess import build_mel_store, preprocess_wav_files
 
-out_path = "mel_data"
-os.makedirs(out_path, exist_ok=True)
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Extract mel spectrograms for a training config. By default they go to one
+        memory-mapped store (mel_store/ in out_path) on a pool of processes, resuming
+        where an earlier run stopped; --per_file writes one .npy per wav instead.
+        Example run: python utils/test.py --config_path train_dir/run/config.json --num_workers 16
+        """,
+        formatter_class=RawTextHelpFormatter,
+    )
+    parser.add_argument("--config_path", type=str,
+                        default="train_dir/run-February-04-2025_02+52PM-8b5b6b9/config.json",
+                        help="config.json of the model whose audio settings to use.")
+    parser.add_argument("--data_path", type=str, default=None,
+                        help="Folder with the wav files (default: the config's dataset path).")
+    parser.add_argument("--out_path", type=str, default="mel_data", help="Output folder.")
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count(), help="Extraction processes.")
+    parser.add_argument("--dtype", type=str, default="float32", choices=["float32", "float16"],
+                        help="Storage type of a new store.")
+    parser.add_argument("--per_file", action="store_true", help="Write mel/ and quant/ .npy files per wav.")
+    args = parser.parse_args()
 
-config_path = "train_dir/run-February-04-2025_02+52PM-8b5b6b9/config.json"
+    config = load_config(args.config_path)
+    ap = AudioProcessor.init_from_config(config)
+    os.makedirs(args.out_path, exist_ok=True)
+    if args.per_file:
+        preprocess_wav_files(args.out_path, config, ap)
+        return
 
-with open(config_path, 'r') as f:
-    config = json.load(f)
+    data_path = args.data_path or getattr(config, "data_path", None) or config.datasets[0].path
+    start = time.perf_counter()
+    result = build_mel_store(args.out_path, data_path, ap, args.num_workers, args.dtype)
+    elapsed = time.perf_counter() - start
+    print(f" > Extracted {result['files']} files ({result['frames']} frames) in {elapsed:.1f} s: "
+          f"{result['frames'] / max(elapsed, 1e-9):.0f} frames/s; {result['skipped']} files already stored.")
+    print(f" > Store: {len(result['store'])} files, {result['store'].frames} frames in {result['store'].data_file}")
 
-ap = AudioProcessor(config)
-
-preprocess_wav_files(out_path, config, ap)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,24 @@
-import azure.cognitiveservices.speech as speechsdk
-from dotenv import dotenv_values
+import os
+import sys
 
-def text_to_speech(text, output_file="output.wav"):
-    config = dotenv_values("configs/.env")
-    speech_key = config["speech_key"]
-    service_region = config["service_region"]
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
-    speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Riff22050Hz16BitMonoPcm)
-    speech_config.speech_synthesis_voice_name = 'bg-BG-KalinaNeural'
+from synthesis_engine import OK
+from tts_backends import make_backend
 
-    audio_config = speechsdk.audio.AudioOutputConfig(filename=output_file)
-    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
+def text_to_speech(text, output_file="output.wav", backend_name="azure"):
+    backend = make_backend(backend_name)
+    try:
+        result = backend.synthesize([text])
+    finally:
+        backend.close()
 
-    result = synthesizer.speak_text_async(text).get()
-
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+    if result.status == OK:
+        with open(output_file, "wb") as f:
+            f.write(result.audio[0])
         return True
     else:
-        print(f"Error: {result.cancellation_details.error_details}")
+        print(f"Error: {result.error}")
         return False
 
 text_to_speech(
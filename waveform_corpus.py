@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+from audio_tools import read_pcm
+from metadata_index import METADATA_FILE, csv_signature, load_index, replace_dir
+
+# --------------------------------------------------------------------
+# 1. Setup and constants
+# --------------------------------------------------------------------
+
+SAMPLE_RATE = 22050
+# Bump when the layout of the corpus changes, so old corpora are repacked.
+CORPUS_VERSION = 1
+
+def corpus_dir(metadata_file):
+    """
+    The packed corpus of a metadata file lives next to it, e.g. metadata.csv.wavs/.
+    """
+    return metadata_file + ".wavs"
+
+# --------------------------------------------------------------------
+# 2. Packing
+# --------------------------------------------------------------------
+
+def resample(samples, rate, target_rate):
+    if rate == target_rate:
+        return samples
+    from math import gcd
+    from scipy.signal import resample_poly
+
+    g = gcd(rate, target_rate)
+    y = resample_poly(samples.astype(np.float32), target_rate // g, rate // g)
+    return np.clip(np.round(y), -32768, 32767).astype(np.int16)
+
+def corpus_signature(metadata_file, sample_rate, resample):
+    return dict(csv_signature(metadata_file), version=CORPUS_VERSION, sample_rate=sample_rate, resample=resample)
+
+def pack_corpus(metadata_file=METADATA_FILE, sample_rate=SAMPLE_RATE, directory=None, resample_audio=True):
+    """
+    Concatenate the 16-bit PCM of every wav listed in metadata_file into
+    one int16 file (samples.int16) with an offsets array (offsets.npy,
+    len(rows) + 1 entries) and the rows' paths (paths.json). Wavs at
+    another rate than sample_rate are resampled when resample_audio is set,
+    as AudioProcessor(resample=True) would; otherwise, since the training
+    loader would use them as they are, packing stops with a ValueError.
+    Rows whose wav is missing get an empty slice. The corpus is written to
+    a temporary folder and moved into place.
+    Returns the number of wavs packed and missing.
+    """
+    directory = directory or corpus_dir(metadata_file)
+    root = os.path.dirname(metadata_file)
+    signature = corpus_signature(metadata_file, sample_rate, resample_audio)
+    index = load_index(metadata_file)
+    paths = [index.path(i) for i in range(len(index))]
+
+    tmp_dir = f"{directory}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    missing = 0
+    with open(os.path.join(tmp_dir, "samples.int16"), "wb") as outfile:
+        for i, path in enumerate(paths):
+            try:
+                with open(os.path.join(root, path), "rb") as infile:
+                    samples, rate = read_pcm(infile.read())
+            except (OSError, EOFError, ValueError) as e:
+                print(f"Skipping {path}: {e}")
+                samples, rate = (), sample_rate
+                missing += 1
+            if rate != sample_rate:
+                if not resample_audio:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    raise ValueError(f"{path} is sampled at {rate} Hz, not {sample_rate} Hz, and resampling is off.")
+                samples = resample(samples, rate, sample_rate)
+            outfile.write(np.asarray(samples, dtype="<i2").tobytes())
+            offsets[i + 1] = offsets[i] + len(samples)
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    with open(os.path.join(tmp_dir, "paths.json"), "w", encoding="utf-8") as outfile:
+        json.dump(paths, outfile, ensure_ascii=False)
+    with open(os.path.join(tmp_dir, "header.json"), "w", encoding="utf-8") as outfile:
+        json.dump({"csv": signature, "rows": len(paths), "sample_rate": sample_rate}, outfile)
+    replace_dir(tmp_dir, directory)
+    return len(paths) - missing, missing
+
+# --------------------------------------------------------------------
+# 3. Loading
+# --------------------------------------------------------------------
+
+class WaveformCorpus:
+    """
+    Read-only, memory-mapped view of a packed corpus. corpus[i] and
+    samples(path) are zero-copy int16 views into the mapped file, so loader
+    workers share the page cache instead of opening and decoding a wav per
+    sample. Paths are matched by file name, as the formatters join them
+    with the dataset root.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "header.json"), "r", encoding="utf-8") as infile:
+            header = json.load(infile)
+        with open(os.path.join(directory, "paths.json"), "r", encoding="utf-8") as infile:
+            paths = json.load(infile)
+        self.signature = header["csv"]
+        self.sample_rate = header["sample_rate"]
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"))
+        data_file = os.path.join(directory, "samples.int16")
+        self.data = (np.memmap(data_file, dtype="<i2", mode="r") if self.offsets[-1]
+                     else np.zeros(0, dtype="<i2"))
+        self.positions = {os.path.basename(path): i for i, path in enumerate(paths)}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def __contains__(self, path):
+        return os.path.basename(path) in self.positions
+
+    def samples(self, path):
+        return self[self.positions[os.path.basename(path)]]
+
+    def load_wav(self, path):
+        """
+        The wav at path as float32 in [-1, 1], like AudioProcessor.load_wav
+        without its trimming and normalization.
+        """
+        return self.samples(path).astype(np.float32) / 32768
+
+    def load_audio(self, path):
+        """
+        Drop-in for TTS.tts.models.vits.load_audio: a (1, samples) float
+        tensor and the sample rate.
+        """
+        import torch
+
+        return torch.from_numpy(self.load_wav(path)).unsqueeze(0), self.sample_rate
+
+def load_corpus(metadata_file=METADATA_FILE, sample_rate=SAMPLE_RATE, resample_audio=True):
+    """
+    Open the packed corpus of metadata_file, packing it first when it is
+    missing, was packed at another sample rate or resampling setting, or
+    the CSV changed.
+    """
+    directory = corpus_dir(metadata_file)
+    expected = corpus_signature(metadata_file, sample_rate, resample_audio)
+    try:
+        corpus = WaveformCorpus(directory)
+        if corpus.signature == expected:
+            return corpus
+    except (OSError, ValueError, KeyError):
+        pass
+    packed, missing = pack_corpus(metadata_file, sample_rate, directory, resample_audio)
+    print(f" > Packed {packed} wav files into {directory} ({missing} missing).")
+    return WaveformCorpus(directory)
+
+def attach_to_audio_processor(ap, corpus):
+    """
+    Make ap.load_wav() serve the wavs in corpus from the mapped file, then
+    trim and normalize them as ap.load_wav() would. Other paths, and loads
+    at another sample rate, still go to the original method.
+    """
+    original = ap.load_wav
+
+    def load_wav(filename, sr=None):
+        if filename not in corpus or (sr or ap.sample_rate) != corpus.sample_rate:
+            return original(filename, sr=sr)
+        x = corpus.load_wav(filename)
+        if ap.do_trim_silence:
+            try:
+                x = ap.trim_silence(x)
+            except ValueError:
+                print(f" [!] File cannot be trimmed for silence - {filename}")
+        if ap.do_sound_norm:
+            x = ap.sound_norm(x)
+        if ap.do_rms_norm:
+            x = ap.rms_volume_norm(x, ap.db_level)
+        return x
+
+    ap.load_wav = load_wav
+    return ap
+
+def attach_to_vits(vits_module, corpus):
+    """
+    Make vits_module.load_audio() (TTS.tts.models.vits) serve the wavs in
+    corpus from the mapped file; other paths still go to the original
+    function.
+    """
+    original = vits_module.load_audio
+
+    def load_audio(file_path):
+        if file_path not in corpus:
+            return original(file_path)
+        return corpus.load_audio(file_path)
+
+    vits_module.load_audio = load_audio
+    return vits_module
+
+class WaveformDataset:
+    """
+    Map-style dataset over formatter items (dicts with "text" and
+    "audio_file") whose audio comes from a packed corpus: item i is the
+    item dict with "wav" set to a zero-copy int16 view of its samples.
+    Works with torch.utils.data.DataLoader as is.
+    """
+
+    def __init__(self, items, corpus):
+        self.items = [item for item in items if item["audio_file"] in corpus]
+        self.corpus = corpus
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        item = self.items[i]
+        return dict(item, wav=self.corpus.samples(item["audio_file"]))
+
+# --------------------------------------------------------------------
+# 4. Main execution
+# --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the wavs of metadata.csv into one memory-mapped int16 file.")
+    parser.add_argument("--metadata", type=str, default=METADATA_FILE, help="metadata.csv listing the wavs.")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE, help="Sample rate of the packed audio.")
+    parser.add_argument("--no-resample", action="store_true",
+                        help="Fail on wavs at another sample rate instead of resampling them.")
+    parser.add_argument("--force", action="store_true", help="Repack even if the corpus is up to date.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.force:
+        pack_corpus(args.metadata, args.sample_rate, resample_audio=not args.no_resample)
+    corpus = load_corpus(args.metadata, args.sample_rate, not args.no_resample)
+    hours = corpus.offsets[-1] / corpus.sample_rate / 3600
+    print(f"{len(corpus)} wavs, {hours:.2f} hours, {corpus.data.nbytes / 1e9:.2f} GB in {corpus_dir(args.metadata)} "
+          f"({time.perf_counter() - start:.1f} s).")
+
+if __name__ == "__main__":
+    main()